@@ -9,6 +9,12 @@ from abc import ABC, abstractmethod
 
 
 class ArgParser(ABC):
+    """
+    Base class for each subcommand.  add_args is called for every subcommand on every invocation,
+    so modules that define an ArgParser MUST NOT import heavy dependencies (fabric, paramiko,
+    requests, yaml, invoke) at module level.  Import them inside of the functions that use them, or
+    under TYPE_CHECKING for annotations, so that they are only loaded when the selected func runs.
+    """
 
     @staticmethod
     @abstractmethod
@@ -6,5 +6,15 @@
 
 REMOTE_CONFIG_DIR = "/etc/rsyncdirector"
 REMOTE_LOG_DIR = "/var/log/rsyncdirector"
+REMOTE_SCRIPTS_DIR = "/var/tmp/rsyncdirector_deploy"
 REMOTE_RSYNC_DIRECTOR_RUN_USER = "rsyncdirector"
 REMOTE_VIRT_ENV_DIR = "/usr/local/rsyncdirector"
+REMOTE_JOBS_DIR = "/var/tmp/rsyncdirector_deploy/jobs"
+REMOTE_TOOLS_DIR = "/usr/local/lib/rsyncdirector_deploy/bin"
+
+# Defaults of the upload and download arguments, defined here so that the arguments can be declared
+# without importing the transfer and download modules.
+TRANSFER_METHODS = ["exec", "sftp"]
+TRANSFER_METHOD_DEFAULT = "exec"
+TRANSFER_CONNECTIONS_DEFAULT = 4
+DOWNLOAD_CONNECTIONS_DEFAULT = 4
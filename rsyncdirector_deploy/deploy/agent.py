@@ -0,0 +1,198 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import json
+import shlex
+from argparse import Namespace
+from io import StringIO
+from logging import Logger
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from rsyncdirector_deploy.deploy.utils import Utils
+
+if TYPE_CHECKING:
+    from fabric import Connection
+
+# The interpreters with which the agent is started, in order of preference.
+AGENT_PYTHON_CANDIDATES = ["python3", "/usr/libexec/platform-python"]
+
+
+class Agent(object):
+    """
+    Client of the helper agent, remote/agent.py, that runs on the installation host for the length
+    of a session.  Operations are sent as JSON lines over a single SSH channel and run in process on
+    the remote host, instead of each starting a new channel and shell.
+    """
+
+    # The running agents keyed by the id of the connection on which they were started.
+    sessions: Dict[int, Agent] = {}
+
+    def __init__(self, conn: Connection, channel, stdin, stdout):
+        self.conn = conn
+        self.channel = channel
+        self.stdin = stdin
+        self.stdout = stdout
+        self.next_id = 0
+
+    @staticmethod
+    def start(conn: Connection, logger: Logger, args: Namespace) -> Agent | None:
+        """
+        Uploads and starts the agent on the connection, with the remote python if one is defined in
+        the args or the first available system interpreter, and registers it so that RemoteOps uses
+        it.  Returns None, and RemoteOps falls back to running commands over the connection, if the
+        agent is disabled or could not be started.
+        """
+        if args.no_remote_agent:
+            return None
+        python_path = getattr(args, "remote_python_path", None)
+        try:
+            remote_script_path = Utils.put_remote_script(conn, "agent.py")
+            candidates = ([python_path] if python_path else []) + AGENT_PYTHON_CANDIDATES
+            cmd = (
+                f"for p in {' '.join(shlex.quote(c) for c in candidates)}; do "
+                f'command -v "$p" > /dev/null 2>&1 && exec "$p" -u {remote_script_path}; '
+                "done; exit 127"
+            )
+            conn.open()
+            channel = conn.client.get_transport().open_session()
+            channel.exec_command(f"sh -c {shlex.quote(cmd)}")
+            agent = Agent(conn, channel, channel.makefile_stdin("wb"), channel.makefile("rb"))
+            agent.call("ping")
+        except Exception as e:
+            logger.info(
+                f"remote agent unavailable, running commands over ssh; host={conn.host}, "
+                f"exception={e}"
+            )
+            return None
+        Agent.sessions[id(conn)] = agent
+        logger.info(f"remote agent started; host={conn.host}")
+        return agent
+
+    @staticmethod
+    def get(conn: Connection) -> Agent | None:
+        return Agent.sessions.get(id(conn))
+
+    @staticmethod
+    def stop(conn: Connection) -> None:
+        agent = Agent.sessions.pop(id(conn), None)
+        if agent is not None:
+            # Closing stdin ends the agent's read loop.
+            agent.stdin.close()
+            agent.channel.shutdown_write()
+            agent.channel.recv_exit_status()
+            agent.channel.close()
+
+    def call(self, op: str, **params) -> Any:
+        self.next_id += 1
+        request = {"id": self.next_id, "op": op, "params": params}
+        self.stdin.write((json.dumps(request) + "\n").encode("utf-8"))
+        self.stdin.flush()
+        line = self.stdout.readline()
+        if not line:
+            raise Exception(
+                f"remote agent exited; host={self.conn.host}, "
+                f"exit_status={self.channel.recv_exit_status()}"
+            )
+        response = json.loads(line)
+        if not response["ok"]:
+            raise Exception(f"remote agent op failed; op={op}, error={response['error']}")
+        return response["result"]
+
+
+class RemoteOps(object):
+    """
+    Operations on the installation host that are run by the agent when one has been started on the
+    connection, and as commands over the connection otherwise.
+    """
+
+    @staticmethod
+    def exists(conn: Connection, path: str) -> bool:
+        agent = Agent.get(conn)
+        if agent is not None:
+            return agent.call("stat", path=path) is not None
+        return conn.run(f"stat {path}", warn=True, hide=True).ok
+
+    @staticmethod
+    def mkdir(conn: Connection, path: str, owner: str | None = None, mode: str | None = None):
+        agent = Agent.get(conn)
+        if agent is not None:
+            agent.call("mkdir", path=path, owner=owner, mode=mode)
+            return
+        conn.run(f"mkdir -p {path}")
+        if owner:
+            conn.run(f"chown {owner} {path}")
+        if mode:
+            conn.run(f"chmod {mode} {path}")
+
+    @staticmethod
+    def write_file(conn: Connection, path: str, data: str, owner: str, mode: str) -> None:
+        agent = Agent.get(conn)
+        if agent is not None:
+            agent.call("write_file", path=path, data=data, owner=owner, mode=mode)
+            return
+        conn.put(StringIO(data), path)
+        conn.run(f"chown {owner} {path}")
+        conn.run(f"chmod {mode} {path}")
+
+    @staticmethod
+    def append_file(conn: Connection, path: str, data: str, user: str) -> None:
+        """
+        Appends data to a file, creating it owned by, and only readable by, the user if it does not
+        exist.
+        """
+        agent = Agent.get(conn)
+        if agent is not None:
+            agent.call("append_file", path=path, data=data, owner=f"{user}:", mode="600")
+            return
+        conn.sudo(f"sh -c {shlex.quote(f'cat >> {path}')}", user=user, in_stream=StringIO(data))
+
+    @staticmethod
+    def read_file(conn: Connection, path: str) -> str | None:
+        agent = Agent.get(conn)
+        if agent is not None:
+            return agent.call("read_file", path=path)
+        result = conn.run(f"cat {path}", warn=True, hide=True)
+        return result.stdout if result.ok else None
+
+    @staticmethod
+    def getent(conn: Connection, database: str, key: str) -> List[str] | None:
+        """
+        Returns the fields of the entry for the key in the passwd or group database, or None.
+        """
+        agent = Agent.get(conn)
+        if agent is not None:
+            entry = agent.call("getent", database=database, key=key)
+            return None if entry is None else [str(field) for field in entry]
+        result = conn.run(f"getent {database} {key}", warn=True, hide=True)
+        if not result.ok:
+            return None
+        return result.stdout.strip().split(":")
+
+    @staticmethod
+    def run(conn: Connection, argv: List[str], user: str | None = None, warn: bool = False) -> Dict:
+        """
+        Runs a command, as the user if provided, and returns its exit_code, stdout and stderr.
+        Raises an Exception if it fails, unless warn is set.
+        """
+        agent = Agent.get(conn)
+        if agent is not None:
+            result = agent.call("run", argv=argv, user=user)
+        else:
+            cmd = shlex.join(argv)
+            if user:
+                r = conn.sudo(cmd, user=user, warn=True, hide=True)
+            else:
+                r = conn.run(cmd, warn=True, hide=True)
+            result = {"exit_code": r.return_code, "stdout": r.stdout, "stderr": r.stderr}
+        if result["exit_code"] != 0 and not warn:
+            raise Exception(f"running command; argv={argv}, user={user}, result={result}")
+        return result
+
+    @staticmethod
+    def systemctl(conn: Connection, *args: str, warn: bool = False) -> Dict:
+        return RemoteOps.run(conn, ["systemctl", *args], warn=warn)
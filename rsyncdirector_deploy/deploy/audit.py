@@ -0,0 +1,285 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from argparse import ArgumentDefaultsHelpFormatter, Namespace
+from logging import Logger
+from typing import Dict, List, Tuple
+
+from rsyncdirector_deploy.argparser import ArgParser
+from rsyncdirector_deploy.consts import REMOTE_CONFIG_DIR
+from rsyncdirector_deploy.deploy.configs import Configs
+from rsyncdirector_deploy.deploy.rsyncdirector_config import RsyncDirectorConfig
+from rsyncdirector_deploy.deploy.utils import Utils
+
+# Collects everything that the audit compares in a single exec on the remote host.  The host
+# hashes its own output and, when it matches the digest from the previous audit, only returns the
+# digest so that the previously parsed state is reused.
+AUDIT_SCRIPT = r"""
+out=$(
+  echo '@@version'
+  {virt_env_dir}/bin/python -c 'import importlib.metadata as m; print(m.version("rsyncdirector"))' 2>/dev/null
+  echo '@@files'
+  find {config_dir} -maxdepth 1 -type f ! -name '*.pid' -exec sha256sum {{}} + 2>/dev/null
+  find /etc/logrotate.d -maxdepth 1 -type f -name 'rsyncdirector-*' -exec sha256sum {{}} + 2>/dev/null
+  [ -f /etc/systemd/system/rsyncdirector@.service ] && sha256sum /etc/systemd/system/rsyncdirector@.service
+  echo '@@units'
+  systemctl list-units 'rsyncdirector@*.service' --all --no-legend --plain 2>/dev/null
+  echo '@@enabled'
+  ls -1 /etc/systemd/system/*.wants/ 2>/dev/null | grep '^rsyncdirector@'
+)
+digest=$(printf '%s' "$out" | sha256sum | cut -d' ' -f1)
+if [ "$digest" = "{previous_digest}" ]; then
+  echo "@@unchanged $digest"
+else
+  echo "@@digest $digest"
+  printf '%s\n' "$out"
+fi
+"""
+
+
+class Audit(ArgParser):
+
+    parser = None
+
+    def __init__(self):
+        super().__init__()
+
+    @staticmethod
+    def add_args(subparsers, parents=[]):
+        Audit.parser = subparsers.add_parser(
+            "audit",
+            help=(
+                "Read-only audit of the rsyncdirector version, deployed config files and service "
+                "instances on many hosts concurrently, reporting drift from the expected state"
+            ),
+            parents=parents + [Configs.get_instance_args(), Configs.get_plan_args()],
+            formatter_class=ArgumentDefaultsHelpFormatter,
+        )
+        Audit.parser.add_argument(
+            "--expected-version",
+            "-v",
+            type=str,
+            default=None,
+            help="The rsyncdirector version expected to be installed.  If omitted it is not compared",
+        )
+        Audit.parser.add_argument(
+            "--format",
+            "-f",
+            type=str,
+            choices=["table", "json"],
+            default="table",
+            help="Output format of the drift report",
+        )
+        Audit.parser.add_argument(
+            "--no-cache",
+            "-x",
+            action="store_true",
+            help="Ignore the results of previous audits and fetch the complete state of every host",
+        )
+        Audit.parser.set_defaults(func=Audit.audit, fleet=True)
+
+    @staticmethod
+    def audit(targets: List[Namespace], logger: Logger) -> None:
+        logger.info(f"Audit.audit; num_hosts={len(targets)}")
+        results = Utils.run_concurrently(targets, Audit.get_host_state, targets[0].parallelism)
+        reachable = [args for args, _, e in results if e is None]
+        expected = dict(zip(map(id, reachable), Audit.get_expected_instances(logger, reachable)))
+
+        reports = []
+        for args, state, e in results:
+            if e is not None:
+                logger.error(f"auditing host failed; host={args.installation_host}, exception={e}")
+                reports.append(
+                    {"host": args.installation_host, "status": "unreachable", "error": str(e)}
+                )
+                continue
+            instances = expected[id(args)]
+            if isinstance(instances, Exception):
+                logger.error(
+                    "planning expected instances failed; "
+                    f"host={args.installation_host}, exception={instances}"
+                )
+                reports.append(
+                    {"host": args.installation_host, "status": "error", "error": str(instances)}
+                )
+                continue
+            reports.append(Audit.get_drift_report(args, state, instances))
+
+        if targets[0].format == "json":
+            print(json.dumps(reports, indent=2))
+            return
+        Audit.print_report(reports)
+
+    @staticmethod
+    def get_host_state(args: Namespace) -> Dict:
+        cache_path = os.path.join(
+            Utils.get_local_cache_dir("audit"), f"{args.installation_host}.json"
+        )
+        cached = None
+        if not args.no_cache:
+            try:
+                with open(cache_path, "r") as fh:
+                    cached = json.load(fh)
+            except (OSError, ValueError):
+                pass
+        previous_digest = cached["digest"] if cached else ""
+
+        conn = Utils.get_connection(args.installation_host, args.installation_user)
+        try:
+            result = conn.run(
+                AUDIT_SCRIPT.format(
+                    virt_env_dir=args.remote_virt_env_dir,
+                    config_dir=REMOTE_CONFIG_DIR,
+                    previous_digest=previous_digest,
+                ),
+                warn=True,
+                hide=True,
+            )
+        finally:
+            conn.close()
+        if not result.ok:
+            raise Exception(f"running audit script; result={result}")
+
+        lines = result.stdout.splitlines()
+        marker, digest = lines[0].split()
+        if marker == "@@unchanged":
+            return cached["state"]
+
+        state = Audit.parse_state(lines[1:])
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump({"digest": digest, "state": state}, fh)
+        os.replace(tmp_path, cache_path)
+        return state
+
+    @staticmethod
+    def parse_state(lines: List[str]) -> Dict:
+        state = {"version": None, "files": {}, "units": {}, "enabled": []}
+        section = None
+        for line in lines:
+            if line.startswith("@@"):
+                section = line[2:]
+                continue
+            if not line.strip():
+                continue
+            match section:
+                case "version":
+                    state["version"] = line.strip()
+                case "files":
+                    checksum, path = line.split(maxsplit=1)
+                    state["files"][path] = checksum
+                case "units":
+                    # UNIT LOAD ACTIVE SUB DESCRIPTION
+                    tokens = line.split()
+                    if len(tokens) >= 4:
+                        state["units"][tokens[0]] = f"{tokens[2]}/{tokens[3]}"
+                case "enabled":
+                    state["enabled"].append(line.strip())
+        return state
+
+    @staticmethod
+    def get_expected_instances(
+        logger: Logger, targets: List[Namespace]
+    ) -> List[List[Dict] | Exception | None]:
+        """
+        Returns the instances that configs would deploy to each host, planned as configs plans them:
+        sharded by the estimates of the sources on the host and with the bandwidth budgets divided
+        between all of the hosts.  None for the hosts without an instance identifier and config, and
+        the exception for the hosts whose instances could not be planned.
+        """
+        selected = [
+            args
+            for args in targets
+            if args.service_instance_identifier is not None
+            and args.local_rsyncdirector_config_file_path is not None
+        ]
+
+        def plan(args: Namespace) -> Tuple[List[Dict], Dict | None]:
+            rsyncdirector_config = RsyncDirectorConfig.load(
+                args.local_rsyncdirector_config_file_path
+            )
+            return Configs.get_host_instances(args, logger, rsyncdirector_config)
+
+        results = Utils.run_concurrently(selected, plan, selected[0].parallelism if selected else 1)
+        planned = [(args, host_plan) for args, host_plan, e in results if e is None]
+        Configs.apply_run_settings(
+            logger, [args for args, _ in planned], [host_plan for _, host_plan in planned]
+        )
+        retval = {id(args): e if e is not None else host_plan[0] for args, host_plan, e in results}
+        return [retval.get(id(args)) for args in targets]
+
+    @staticmethod
+    def get_drift_report(args: Namespace, state: Dict, instances: List[Dict] | None) -> Dict:
+        drift = []
+        if args.expected_version is not None and state["version"] != args.expected_version:
+            drift.append(f"version {state['version']} != {args.expected_version}")
+
+        changed, missing, unmanaged = [], [], []
+        if instances is not None:
+            expected_files = {
+                file["remote_path"]: hashlib.sha256(file["data"].encode("utf-8")).hexdigest()
+                for file in Configs.get_files(args, instances)
+            }
+            for path, checksum in expected_files.items():
+                if path not in state["files"]:
+                    missing.append(path)
+                elif state["files"][path] != checksum:
+                    changed.append(path)
+            # Files for other instances on the same host are reported, but are not drift.
+            unmanaged = [p for p in state["files"] if p not in expected_files]
+            drift.extend(f"missing {p}" for p in missing)
+            drift.extend(f"changed {p}" for p in changed)
+
+            instance_ids = {instance["id"] for instance in instances}
+            for instance in instances:
+                unit = f"rsyncdirector@{instance['id']}.service"
+                if not state["units"].get(unit, "").startswith("active"):
+                    drift.append(f"{unit} {state['units'].get(unit, 'not loaded')}")
+            # Shards that configs no longer deploys, ie: after --shards was lowered.
+            for path in unmanaged:
+                name = os.path.basename(path)
+                if not (name.startswith("rsyncdirector-") and name.endswith(".env")):
+                    continue
+                instance_id = name.removeprefix("rsyncdirector-").removesuffix(".env")
+                if (
+                    Configs.get_shard_index(args, instance_id) is not None
+                    and instance_id not in instance_ids
+                ):
+                    drift.append(f"stale shard {instance_id}")
+
+        return {
+            "host": args.installation_host,
+            "status": "drift" if drift else "in-sync",
+            "version": state["version"],
+            "files": len(state["files"]),
+            "changed": changed,
+            "missing": missing,
+            "unmanaged": unmanaged,
+            "units": state["units"],
+            "enabled": state["enabled"],
+            "drift": drift,
+        }
+
+    @staticmethod
+    def print_report(reports: List[Dict]) -> None:
+        print(f"{'HOST':<32} {'STATUS':<12} {'VERSION':<12} {'FILES':>5} {'RUNNING':>7}  DRIFT")
+        for report in reports:
+            if "error" in report:
+                print(f"{report['host']:<32} {report['status']:<12} {report['error']}")
+                continue
+            running = sum(1 for s in report["units"].values() if s.startswith("active"))
+            print(
+                f"{report['host']:<32} {report['status']:<12} {str(report['version']):<12} "
+                f"{report['files']:>5} {running:>3}/{len(report['units']):<3}  "
+                f"{'; '.join(report['drift'])}"
+            )
+        needs_push = [r["host"] for r in reports if r["status"] != "in-sync"]
+        print(f"\n{len(needs_push)} of {len(reports)} hosts need attention: {' '.join(needs_push)}")
@@ -0,0 +1,174 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import re
+from argparse import Namespace
+from logging import Logger
+from typing import Dict, List, Tuple
+
+from rsyncdirector_deploy.deploy.utils import Utils
+
+RATE_UNITS_KIB = {"": 1, "K": 1, "M": 1024, "G": 1024 * 1024}
+
+
+class Bandwidth(object):
+    """
+    Divides the bandwidth budget of each sync target between all of the instances in the run that
+    sync to it, and writes each instance's share to the sync actions of its jobs for that target
+    as rsync --bwlimit.  The jobs of an instance run one after another, so each of them is given
+    the instance's whole share.
+    """
+
+    @staticmethod
+    def get_budgets(targets: List[Namespace]) -> Dict[str, int]:
+        """
+        Returns the budget of each target in KiB/s.  The budgets apply to the whole run, so they
+        must be the same for every host.
+        """
+        budgets = None
+        for args in targets:
+            try:
+                host_budgets = Bandwidth.parse_budgets(args.target_bandwidth_budget or [])
+            except Exception as e:
+                raise Exception(
+                    f"parsing target bandwidth budgets; host={args.installation_host}, error={e}"
+                )
+            if budgets is not None and host_budgets != budgets:
+                raise Exception(
+                    "target bandwidth budgets must be the same for every host in the run; "
+                    f"host={args.installation_host}, budgets={host_budgets}, expected={budgets}"
+                )
+            budgets = host_budgets
+        return budgets or {}
+
+    @staticmethod
+    def parse_budgets(values: str | List[str]) -> Dict[str, int]:
+        """
+        Returns the budget in KiB/s of each target from TARGET=RATE values, either a list of them or
+        a single one.
+        """
+        if isinstance(values, str):
+            values = [values]
+        budgets = {}
+        for value in values:
+            if not isinstance(value, str):
+                raise Exception(
+                    f"invalid target bandwidth budget, expected a TARGET=RATE string; value={value}"
+                )
+            target, sep, rate = value.partition("=")
+            if not sep or not target.strip():
+                raise Exception(
+                    f"invalid target bandwidth budget, expected TARGET=RATE; value={value}"
+                )
+            match = re.fullmatch(r"(\d+)([KMG]?)", rate.strip().upper())
+            if match is None:
+                raise Exception(
+                    "invalid target bandwidth budget rate, expected KiB/s or a number with a K, M "
+                    f"or G suffix; value={value}, rate={rate}"
+                )
+            budgets[target.strip()] = int(match.group(1)) * RATE_UNITS_KIB[match.group(2)]
+        return budgets
+
+    @staticmethod
+    def allocate(
+        logger: Logger,
+        targets: List[Namespace],
+        plans: List[Tuple[List[Dict], Dict | None]],
+        budgets: Dict[str, int],
+    ) -> List[Dict]:
+        """
+        Rewrites the config of every instance that syncs to a target with a budget, in place, and
+        returns the allocation of each instance to each target.
+        """
+        # Every (instance, target) pair that competes for the target's budget.
+        claims = []
+        for args, (instances, estimates) in zip(targets, plans):
+            for instance in instances:
+                config = Utils.load_yaml_string(instance["config_data"])
+                instance_claims = []
+                for target in budgets:
+                    jobs = [
+                        job
+                        for job in config["jobs"]
+                        if job["type"] == "remote" and job.get("host") == target
+                    ]
+                    if not jobs:
+                        continue
+                    weight = args.bandwidth_priority
+                    if args.bandwidth_weight == "size" and estimates is not None:
+                        weight *= max(
+                            sum(
+                                estimates["jobs"].get(job["id"], {}).get("bytes", 0) for job in jobs
+                            ),
+                            1,
+                        )
+                    instance_claims.append(
+                        {
+                            "host": args.installation_host,
+                            "instance": instance["id"],
+                            "target": target,
+                            "weight": weight,
+                            "jobs": jobs,
+                        }
+                    )
+                if instance_claims:
+                    claims.append((instance, config, instance_claims))
+
+        total_weights = {}
+        for _, _, instance_claims in claims:
+            for claim in instance_claims:
+                total_weights[claim["target"]] = (
+                    total_weights.get(claim["target"], 0) + claim["weight"]
+                )
+
+        allocations = []
+        for instance, config, instance_claims in claims:
+            for claim in instance_claims:
+                target = claim["target"]
+                if total_weights[target] <= 0:
+                    raise Exception(f"bandwidth weights must be positive; target={target}")
+                bwlimit = max(int(budgets[target] * claim["weight"] / total_weights[target]), 1)
+                for job in claim["jobs"]:
+                    for action in job["actions"]:
+                        if action["action"] == "sync":
+                            action["opts"] = Bandwidth.set_bwlimit(action.get("opts", []), bwlimit)
+                logger.info(
+                    f"bandwidth allocated; host={claim['host']}, instance={claim['instance']}, "
+                    f"target={target}, bwlimit_kib={bwlimit}"
+                )
+                allocations.append(
+                    {
+                        "host": claim["host"],
+                        "instance": claim["instance"],
+                        "target": target,
+                        "weight": claim["weight"],
+                        "bwlimit_kib": bwlimit,
+                    }
+                )
+            instance["config_data"] = Utils.dump_yaml(config)
+        return allocations
+
+    @staticmethod
+    def set_bwlimit(opts: List[str], bwlimit: int) -> List[str]:
+        """
+        Returns the rsync opts with any existing --bwlimit replaced by the given limit in KiB/s.
+        """
+        retval = []
+        skip_value = False
+        for opt in opts:
+            if skip_value:
+                skip_value = False
+                continue
+            if opt == "--bwlimit":
+                skip_value = True
+                continue
+            if opt.startswith("--bwlimit="):
+                continue
+            retval.append(opt)
+        retval.append(f"--bwlimit={bwlimit}")
+        return retval
@@ -0,0 +1,380 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+import json
+import os
+import sys
+import time
+from argparse import ArgumentDefaultsHelpFormatter, Namespace
+from logging import Logger
+
+from rsyncdirector_deploy.argparser import ArgParser
+from rsyncdirector_deploy.consts import (
+    DOWNLOAD_CONNECTIONS_DEFAULT,
+    TRANSFER_CONNECTIONS_DEFAULT,
+    TRANSFER_METHODS,
+)
+from rsyncdirector_deploy.deploy.utils import Utils
+
+# Modules that MUST NOT be imported when the cli only parses its arguments or renders help.
+HEAVY_MODULES = ["fabric", "paramiko", "invoke", "requests", "yaml"]
+
+# Run in a fresh interpreter for each sample so that nothing is already in sys.modules.
+IMPORT_TIME_SCRIPT = """
+import contextlib, io, json, sys, time
+argv, heavy_modules = json.loads(sys.argv[1]), json.loads(sys.argv[2])
+start = time.perf_counter()
+from rsyncdirector_deploy import main
+sys.argv = ["rsyncdirector_deploy"] + argv
+with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+    try:
+        main.parse_args()
+    except SystemExit:
+        pass
+elapsed_ms = (time.perf_counter() - start) * 1000
+heavy = [m for m in heavy_modules if m in sys.modules]
+print(json.dumps({"elapsed_ms": elapsed_ms, "heavy_modules": heavy}))
+"""
+
+IMPORT_TIME_ARGV_DEFAULT = [
+    "-h",
+    "rsyncdirector -h",
+    "rsyncdirector configs -h",
+    "python -h",
+    "benchmark -h",
+]
+
+
+class Benchmark(ArgParser):
+
+    parser = None
+
+    def __init__(self):
+        super().__init__()
+
+    @staticmethod
+    def add_args(subparsers, parents=[]):
+        # The benchmarks run on the local host, the parents with the installation host arguments
+        # are not added.
+        Benchmark.parser = subparsers.add_parser(
+            "benchmark",
+            help="Run benchmarks for the deployment tool itself",
+            formatter_class=ArgumentDefaultsHelpFormatter,
+        )
+        benchmark_subparsers = Benchmark.parser.add_subparsers(
+            dest="benchmark", help="Choose benchmark", required=True
+        )
+
+        import_time = benchmark_subparsers.add_parser(
+            "import-time",
+            help=(
+                "Measure the time to import the cli and parse the arguments for help-only "
+                "invocations and fail if it is over the threshold or if any heavy dependencies "
+                "were imported"
+            ),
+            formatter_class=ArgumentDefaultsHelpFormatter,
+        )
+        import_time.add_argument(
+            "--argv",
+            "-a",
+            type=str,
+            nargs="+",
+            default=IMPORT_TIME_ARGV_DEFAULT,
+            help="Command lines to benchmark, each as a single quoted string",
+        )
+        import_time.add_argument(
+            "--samples",
+            "-n",
+            type=int,
+            default=10,
+            help="Number of fresh interpreters to run per command line",
+        )
+        import_time.add_argument(
+            "--max-ms",
+            "-m",
+            type=float,
+            default=100.0,
+            help="Fail if the median import and parse time of any command line exceeds this",
+        )
+        import_time.set_defaults(func=Benchmark.import_time)
+
+        transfer = benchmark_subparsers.add_parser(
+            "transfer",
+            help=(
+                "Measure the upload throughput of Fabric's put and of each transfer method, by "
+                "default over the loopback interface"
+            ),
+            formatter_class=ArgumentDefaultsHelpFormatter,
+        )
+        transfer.add_argument(
+            "--host",
+            "-o",
+            type=str,
+            default="localhost",
+            help="Host to which to upload, the current user's SSH keys must be authorized on it",
+        )
+        transfer.add_argument(
+            "--user",
+            "-s",
+            type=str,
+            default=None,
+            help="User with which to connect, defaults to the current user",
+        )
+        transfer.add_argument(
+            "--size-mib",
+            "-z",
+            type=Utils.positive_int,
+            default=256,
+            help="Size of the random file to upload",
+        )
+        transfer.add_argument(
+            "--connections",
+            "-c",
+            type=int,
+            default=TRANSFER_CONNECTIONS_DEFAULT,
+            help="Number of SSH channels used by the transfer methods",
+        )
+        transfer.add_argument(
+            "--remote-dir",
+            "-r",
+            type=str,
+            default="/var/tmp",
+            help="Directory on the host into which to upload, the uploaded files are removed",
+        )
+        transfer.set_defaults(func=Benchmark.transfer)
+
+        download = benchmark_subparsers.add_parser(
+            "download",
+            help=(
+                "Download files from a local HTTP server with and without range support, and an "
+                "empty file, measuring the throughput and failing if any download is not identical"
+            ),
+            formatter_class=ArgumentDefaultsHelpFormatter,
+        )
+        download.add_argument(
+            "--size-mib",
+            "-z",
+            type=Utils.positive_int,
+            default=64,
+            help="Size of the random file to download",
+        )
+        download.add_argument(
+            "--connections",
+            "-c",
+            type=Utils.positive_int,
+            default=DOWNLOAD_CONNECTIONS_DEFAULT,
+            help="Number of connections over which the ranges are downloaded",
+        )
+        download.add_argument(
+            "--chunk-size-mib",
+            "-k",
+            type=Utils.positive_int,
+            default=4,
+            help="Size of each range request",
+        )
+        download.set_defaults(func=Benchmark.download)
+
+    @staticmethod
+    def import_time(args: Namespace, logger: Logger) -> None:
+        import statistics
+        import subprocess
+
+        logger.info("Benchmark.import_time")
+        failures = []
+        print(f"{'argv':<32} {'median_ms':>10} {'max_ms':>10} {'process_ms':>10}  heavy_modules")
+        for argv in args.argv:
+            elapsed = []
+            process_elapsed = []
+            heavy_modules = set()
+            for _ in range(args.samples):
+                start = time.perf_counter()
+                result = subprocess.run(
+                    [
+                        sys.executable,
+                        "-c",
+                        IMPORT_TIME_SCRIPT,
+                        json.dumps(argv.split()),
+                        json.dumps(HEAVY_MODULES),
+                    ],
+                    capture_output=True,
+                    text=True,
+                )
+                process_elapsed.append((time.perf_counter() - start) * 1000)
+                if result.returncode != 0:
+                    raise Exception(
+                        f"running import time sample; argv={argv}, stderr={result.stderr}"
+                    )
+                sample = json.loads(result.stdout)
+                elapsed.append(sample["elapsed_ms"])
+                heavy_modules.update(sample["heavy_modules"])
+
+            median_ms = statistics.median(elapsed)
+            print(
+                f"{argv:<32} {median_ms:>10.1f} {max(elapsed):>10.1f} "
+                f"{statistics.median(process_elapsed):>10.1f}  {','.join(sorted(heavy_modules))}"
+            )
+            if heavy_modules:
+                failures.append(f"heavy modules imported; argv={argv}, modules={heavy_modules}")
+            if median_ms > args.max_ms:
+                failures.append(
+                    f"import and parse time over threshold; argv={argv}, "
+                    f"median_ms={median_ms:.1f}, max_ms={args.max_ms}"
+                )
+
+        if failures:
+            for failure in failures:
+                logger.error(failure)
+            sys.exit(1)
+
+    @staticmethod
+    def transfer(args: Namespace, logger: Logger) -> None:
+        import tempfile
+
+        from fabric import Connection
+
+        from rsyncdirector_deploy.deploy.transfer import Transfer
+
+        logger.info(f"Benchmark.transfer; host={args.host}, size_mib={args.size_mib}")
+        conn = Connection(host=args.host, user=args.user)
+        remote_path = os.path.join(args.remote_dir, f"rsyncdirector_deploy-benchmark-{os.getpid()}")
+        with tempfile.NamedTemporaryFile() as fh:
+            # Random data so that nothing along the way can compress it.
+            for _ in range(args.size_mib):
+                fh.write(os.urandom(1024 * 1024))
+            fh.flush()
+
+            print(f"{'method':<12} {'seconds':>8} {'mb_s':>8}")
+            start = time.perf_counter()
+            conn.put(fh.name, remote_path)
+            seconds = time.perf_counter() - start
+            print(f"{'fabric-put':<12} {seconds:>8.2f} {args.size_mib * 1.048576 / seconds:>8.1f}")
+            for method in TRANSFER_METHODS:
+                conn.run(f"rm -f {remote_path}", hide=True)
+                stats = Transfer.put(
+                    conn, logger, fh.name, remote_path, method=method, connections=args.connections
+                )
+                print(f"{method:<12} {stats['seconds']:>8.2f} {stats['mb_s']:>8.1f}")
+
+            # The file is already on the host, only its digest is compared.
+            stats = Transfer.put(conn, logger, fh.name, remote_path)
+            print(f"{'unchanged':<12} {stats['seconds']:>8.2f} {'-':>8}")
+        conn.run(f"rm -f {remote_path}", hide=True)
+        conn.close()
+
+    @staticmethod
+    def download(args: Namespace, logger: Logger) -> None:
+        import hashlib
+        import tempfile
+        import threading
+        from http.server import ThreadingHTTPServer
+
+        from rsyncdirector_deploy.deploy.download import Download
+
+        logger.info(f"Benchmark.download; size_mib={args.size_mib}")
+        failures = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            serve_dir = os.path.join(tmp_dir, "serve")
+            os.mkdir(serve_dir)
+            files = {"random": os.urandom(args.size_mib * 1024 * 1024), "empty": b""}
+            for name, data in files.items():
+                with open(os.path.join(serve_dir, name), "wb") as fh:
+                    fh.write(data)
+
+            servers = {}
+            for ranges in (True, False):
+                server = ThreadingHTTPServer(
+                    ("127.0.0.1", 0), Benchmark.get_http_handler(serve_dir, ranges)
+                )
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                servers[ranges] = server
+
+            cases = [
+                ("ranges", True, "random"),
+                ("no-ranges", False, "random"),
+                ("empty", True, "empty"),
+                ("empty-no-ranges", False, "empty"),
+            ]
+            print(f"{'case':<16} {'seconds':>8} {'mb_s':>8}")
+            try:
+                for case, ranges, name in cases:
+                    port = servers[ranges].server_address[1]
+                    dest_path = os.path.join(tmp_dir, f"{case}.download")
+                    start = time.perf_counter()
+                    try:
+                        Download.fetch(
+                            logger,
+                            f"http://127.0.0.1:{port}/{name}",
+                            dest_path,
+                            hashlib.sha256(files[name]).hexdigest(),
+                            digest_algorithm="sha256",
+                            connections=args.connections,
+                            chunk_size=args.chunk_size_mib * 1024 * 1024,
+                        )
+                    except Exception as e:
+                        failures.append(f"download failed; case={case}, exception={e}")
+                        print(f"{case:<16} {'failed':>8} {'-':>8}")
+                        continue
+                    seconds = time.perf_counter() - start
+                    mb_s = (
+                        f"{len(files[name]) / seconds / 1e6:>8.1f}" if files[name] else f"{'-':>8}"
+                    )
+                    print(f"{case:<16} {seconds:>8.2f} {mb_s}")
+            finally:
+                for server in servers.values():
+                    server.shutdown()
+                    server.server_close()
+
+        if failures:
+            for failure in failures:
+                logger.error(failure)
+            sys.exit(1)
+
+    @staticmethod
+    def get_http_handler(directory: str, ranges: bool):
+        """
+        Returns a request handler serving the files in the directory, honouring single byte range
+        requests only if ranges is set.
+        """
+        import re
+        from http.server import BaseHTTPRequestHandler
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                path = os.path.join(directory, os.path.basename(self.path))
+                if not os.path.isfile(path):
+                    self.send_error(404)
+                    return
+                with open(path, "rb") as fh:
+                    data = fh.read()
+
+                match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+                if not ranges or match is None:
+                    self.send_response(200)
+                elif int(match.group(1)) >= len(data):
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(data)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                else:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+                    data = data[start : end + 1]
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The range probe closes the connection once it has the response headers.
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
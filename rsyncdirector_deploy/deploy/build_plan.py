@@ -0,0 +1,128 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import shlex
+from argparse import Namespace
+from logging import Logger
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from fabric import Connection
+
+# tmpfs on which the build tree is placed when there is room for it.
+REMOTE_TMPFS_DIR = "/dev/shm"
+
+# The host is considered to be running a production workload when its 5 minute load average per
+# core is at or above this ratio, and the build is run at a lower CPU and IO priority.
+BUSY_LOAD_RATIO = 0.5
+BUILD_NICE = 10
+# Lowest priority of the best-effort class; the idle class can starve the build on a busy disk.
+BUILD_IONICE = "-c 2 -n 7"
+
+MIB = 1024 * 1024
+
+# Collects the facts from which the build is planned in a single exec.
+FACTS_SCRIPT = r"""
+echo "cores=$(nproc)"
+echo "mem_available_kib=$(awk '/^MemAvailable:/ {{print $2}}' /proc/meminfo)"
+echo "load=$(cut -d' ' -f2 /proc/loadavg)"
+if [ "$(stat -f -c %T {tmpfs_dir} 2> /dev/null)" = tmpfs ]; then
+  echo "tmpfs_free_kib=$(df -P -k {tmpfs_dir} | awk 'NR == 2 {{print $4}}')"
+  echo "tmpfs_options=$(awk '$2 == "{tmpfs_dir}" {{print $4}}' /proc/mounts | tail -n 1)"
+fi
+command -v ionice > /dev/null 2>&1 && echo "ionice=1"
+exit 0
+"""
+
+
+class BuildPlan(object):
+    """
+    Plans how to compile Python on the installation host from its cores, available memory, load
+    and free tmpfs, if it is not mounted noexec: the number of parallel make jobs, whether to
+    place the build tree on tmpfs and whether to lower the CPU and IO priority of the build so that
+    it does not slow down the host's workload.
+    """
+
+    @staticmethod
+    def get_facts(conn: Connection) -> Dict:
+        result = conn.run(FACTS_SCRIPT.format(tmpfs_dir=REMOTE_TMPFS_DIR), warn=True, hide=True)
+        if not result.ok:
+            raise Exception(f"getting build host facts; result={result}")
+        values = dict(line.split("=", 1) for line in result.stdout.splitlines() if "=" in line)
+        return {
+            "cores": int(values["cores"]),
+            "mem_available_bytes": int(values["mem_available_kib"]) * 1024,
+            "load": float(values["load"]),
+            "tmpfs_free_bytes": (
+                int(values["tmpfs_free_kib"]) * 1024 if "tmpfs_free_kib" in values else None
+            ),
+            # configure and the binaries that it builds cannot be run from a noexec mount.
+            "tmpfs_exec": "noexec" not in values.get("tmpfs_options", "").split(","),
+            "ionice": "ionice" in values,
+        }
+
+    @staticmethod
+    def plan(logger: Logger, args: Namespace, facts: Dict, profile: Dict) -> Dict:
+        """
+        Returns the plan for the build with the given profile.  The make jobs are limited to the
+        cores that are not busy and to the memory that is left once the build tree, if on tmpfs,
+        has been accounted for.
+        """
+        build_tree_bytes = profile["build_tree_mib"] * MIB
+        job_memory_bytes = profile["job_memory_mib"] * MIB
+
+        # The persistent tree of an incremental build must stay at the same path, and on disk, for
+        # its compiler cache entries to be reused.
+        tmpfs = (
+            not args.incremental
+            and not args.no_build_tmpfs
+            and facts["tmpfs_free_bytes"] is not None
+            and facts["tmpfs_exec"]
+            and facts["tmpfs_free_bytes"] >= build_tree_bytes
+            and facts["mem_available_bytes"] - build_tree_bytes >= job_memory_bytes
+        )
+        memory_bytes = facts["mem_available_bytes"] - (build_tree_bytes if tmpfs else 0)
+
+        busy = facts["load"] >= facts["cores"] * BUSY_LOAD_RATIO
+        if args.make_jobs > 0:
+            make_jobs = args.make_jobs
+        else:
+            idle_cores = facts["cores"] - int(facts["load"])
+            make_jobs = max(1, min(idle_cores, memory_bytes // job_memory_bytes))
+
+        match args.build_priority:
+            case "low":
+                low_priority = True
+            case "normal":
+                low_priority = False
+            case _:
+                low_priority = busy
+
+        plan = {
+            "make_jobs": int(make_jobs),
+            "tmpfs": tmpfs,
+            "low_priority": low_priority,
+            "ionice": low_priority and facts["ionice"],
+            "facts": facts,
+        }
+        logger.info(
+            f"python build planned; make_jobs={plan['make_jobs']}, tmpfs={tmpfs}, "
+            f"low_priority={low_priority}, cores={facts['cores']}, load={facts['load']}, "
+            f"mem_available_mib={facts['mem_available_bytes'] // MIB}"
+        )
+        return plan
+
+    @staticmethod
+    def wrap_command(plan: Dict, command: str) -> str:
+        """
+        Returns the command run at the planned CPU and IO priority.
+        """
+        if not plan["low_priority"]:
+            return command
+        ionice = f"ionice {BUILD_IONICE} " if plan["ionice"] else ""
+        return f"nice -n {BUILD_NICE} {ionice}sh -c {shlex.quote(command)}"
@@ -7,21 +7,27 @@
 from __future__ import annotations
 
 import os
+import shlex
 import string
 import sys
-from argparse import ArgumentDefaultsHelpFormatter, Namespace
-from io import StringIO
+from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser, Namespace
 from logging import Logger
 from pathlib import Path
-from typing import Dict
-
-from fabric import Connection
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
 from rsyncdirector_deploy.argparser import ArgParser
 from rsyncdirector_deploy.consts import REMOTE_CONFIG_DIR, REMOTE_LOG_DIR
+from rsyncdirector_deploy.deploy.agent import Agent, RemoteOps
+from rsyncdirector_deploy.deploy.bandwidth import Bandwidth
 from rsyncdirector_deploy.deploy.linux import LinuxDistro
+from rsyncdirector_deploy.deploy.rsyncdirector_config import RsyncDirectorConfig
+from rsyncdirector_deploy.deploy.schedule import Schedule
+from rsyncdirector_deploy.deploy.sharding import Sharding
 from rsyncdirector_deploy.deploy.utils import Utils
 
+if TYPE_CHECKING:
+    from fabric import Connection
+
 
 class Configs(ArgParser):
 
@@ -38,42 +44,214 @@ class Configs(ArgParser):
                 "Deploy the configurations and required directories and systemd configurations "
                 "to run the application"
             ),
-            parents=parents,
+            parents=parents + [Configs.get_instance_args(), Configs.get_plan_args()],
             formatter_class=ArgumentDefaultsHelpFormatter,
         )
 
-        Configs.parser.set_defaults(func=Configs.install)
+        Configs.parser.set_defaults(func=Configs.install, fleet=True)
         Configs.parser.add_argument(
+            "--clear-existing-configs",
+            "-k",
+            action="store_true",
+            help="Will clear any existing configs in the /etc/rsyncdirector dir on the installation host",
+        )
+
+    @staticmethod
+    def get_instance_args() -> ArgumentParser:
+        """
+        Returns a parent parser with the arguments that select the instance deployed by configs and
+        its rsyncdirector config, for the subcommands that inspect it.
+        """
+        instance_args = ArgumentParser(add_help=False)
+        instance_args.add_argument(
             "--service-instance-identifier",
             "-i",
             type=str,
-            required=True,
+            default=None,
             help=(
                 "Deployment configurations allow for multiple instances of the rsyncdirector to be "
                 "running on an individual host at the same time.  This is achieved through the use of "
                 "a systemd service template.  This configuration defines the systemd serivce instance "
-                "for this deployment."
+                "for this deployment.  Required, either on the command line or in the inventory."
             ),
         )
-        Configs.parser.add_argument(
+        instance_args.add_argument(
             "--local-rsyncdirector-config-file-path",
             "-c",
             type=str,
-            required=True,
-            help="Path on the local host to the rsyncdirector config file to be deployed to the installation host",
+            default=None,
+            help=(
+                "Path on the local host to the rsyncdirector config file to be deployed to the "
+                "installation host.  Required, either on the command line or in the inventory"
+            ),
         )
+        return instance_args
 
-        Configs.parser.add_argument(
-            "--clear-existing-configs",
-            "-k",
-            action="store_true",
-            help="Will clear any existing configs in the /etc/rsyncdirector dir on the installation host",
+    @staticmethod
+    def get_plan_args() -> ArgumentParser:
+        """
+        Returns a parent parser with the arguments that change how the config is deployed as
+        instances, so that other subcommands can compute the expected state of an installation host.
+        """
+        plan_args = ArgumentParser(add_help=False)
+        plan_args.add_argument(
+            "--schedule-jitter-window",
+            "-w",
+            type=Utils.positive_int,
+            default=None,
+            help=(
+                "Delay the cron_schedule of each instance by up to this many minutes, by an offset "
+                "derived from the hash of the installation host and the instance identifier, so "
+                "that hosts deployed with the same config do not all start at once.  The same host "
+                "and instance always get the same offset.  The config is re-serialized, dropping "
+                "any comments"
+            ),
+        )
+        plan_args.add_argument(
+            "--target-bandwidth-budget",
+            "-b",
+            type=str,
+            action="append",
+            default=None,
+            help=(
+                "TARGET=RATE, the total bandwidth that all of the instances deployed in this run "
+                "may use to sync to the remote job host TARGET.  RATE is in KiB/s, or with a K, M "
+                "or G suffix.  It is divided between the instances that sync to the target and "
+                "written to their sync actions as rsync --bwlimit.  May be repeated"
+            ),
+        )
+        plan_args.add_argument(
+            "--shards",
+            "-d",
+            type=str,
+            default=None,
+            help=(
+                "Split the jobs in the rsyncdirector config between this many service instances, "
+                "balanced by the estimated size and number of files of each job's sources on the "
+                "installation host.  'auto' derives the number of instances from the number of "
+                "cores and of distinct disks holding the sources.  Instance N is deployed as "
+                "<service-instance-identifier>-N"
+            ),
+        )
+        plan_args.add_argument(
+            "--bandwidth-weight",
+            "-g",
+            type=str,
+            choices=["equal", "size"],
+            default="equal",
+            help=(
+                "How a target's bandwidth budget is divided between the instances that sync to "
+                "it: equally, or by the estimated size of the sources of their jobs that sync to it"
+            ),
+        )
+        plan_args.add_argument(
+            "--bandwidth-priority",
+            "-y",
+            type=float,
+            default=1.0,
+            help=(
+                "Multiplies the weight of the instances on the host when dividing the bandwidth "
+                "budgets, typically defined per host or group in the inventory"
+            ),
         )
+        return plan_args
 
     @staticmethod
-    def install(args: Namespace, logger: Logger):
+    def install(targets: List[Namespace], logger: Logger):
         logger.info("Configs.install")
+
+        # Parse and validate the configs for all of the hosts before connecting to any of them so
+        # that a broken config fails on the local host instead of when rsyncdirector starts.
+        rsyncdirector_configs = []
+        for args in targets:
+            Utils.check_required_args(
+                args,
+                [
+                    "service_instance_identifier",
+                    "local_rsyncdirector_config_file_path",
+                    "remote_python_path",
+                ],
+            )
+            rsyncdirector_configs.append(
+                RsyncDirectorConfig.load(args.local_rsyncdirector_config_file_path)
+            )
+        logger.info(f"rsyncdirector configs validated; num_hosts={len(targets)}")
+
+        # The instances of every host are planned before any host is installed, as the bandwidth of
+        # each target is divided between all of the instances in the run that sync to it.
+        plans = [
+            Configs.get_host_instances(args, logger, rsyncdirector_config)
+            for args, rsyncdirector_config in zip(targets, rsyncdirector_configs)
+        ]
+        allocations, schedules = Configs.apply_run_settings(logger, targets, plans)
+        for args, rsyncdirector_config, (instances, _) in zip(
+            targets, rsyncdirector_configs, plans
+        ):
+            Configs.install_host(args, logger, rsyncdirector_config, instances)
+
+        if allocations:
+            print(f"\n{'HOST':<32} {'INSTANCE':<24} {'TARGET':<24} {'WEIGHT':>12}  BWLIMIT")
+            for allocation in allocations:
+                print(
+                    f"{allocation['host']:<32} {allocation['instance']:<24} "
+                    f"{allocation['target']:<24} {allocation['weight']:>12.4g}  "
+                    f"{allocation['bwlimit_kib']} KiB/s"
+                )
+        if schedules:
+            print(f"\n{'HOST':<32} {'INSTANCE':<24} {'OFFSET':>6}  CRON_SCHEDULE")
+            for schedule in schedules:
+                print(
+                    f"{schedule['host']:<32} {schedule['instance']:<24} "
+                    f"{schedule['offset_minutes']:>5}m  {schedule['cron_schedule']}"
+                )
+
+    @staticmethod
+    def apply_run_settings(
+        logger: Logger, targets: List[Namespace], plans: List[Tuple[List[Dict], Dict | None]]
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Divides the bandwidth budgets between the planned instances of every host and jitters their
+        schedules, rewriting their configs in place, and returns the allocations and schedules.
+        """
+        allocations = []
+        budgets = Bandwidth.get_budgets(targets)
+        if budgets:
+            allocations = Bandwidth.allocate(logger, targets, plans, budgets)
+        schedules = []
+        for args, (instances, _) in zip(targets, plans):
+            if args.schedule_jitter_window:
+                schedules.extend(Schedule.apply_jitter(logger, args, instances))
+        return allocations, schedules
+
+    @staticmethod
+    def get_host_instances(
+        args: Namespace, logger: Logger, rsyncdirector_config: Dict
+    ) -> Tuple[List[Dict], Dict | None]:
+        """
+        Returns the instances to deploy to the host and, when they are needed to shard the config
+        or weight its bandwidth, the estimates of the sources of its jobs.
+        """
+        estimates = None
+        if args.shards is not None or (
+            args.target_bandwidth_budget and args.bandwidth_weight == "size"
+        ):
+            Utils.check_required_args(args, ["remote_python_path"])
+            conn = Utils.get_connection(args.installation_host, args.installation_user)
+            try:
+                estimates = Sharding.estimate(conn, args, rsyncdirector_config)
+            finally:
+                conn.close()
+        if args.shards is not None:
+            return Sharding.get_instances(logger, args, rsyncdirector_config, estimates), estimates
+        return Configs.get_instances(args), estimates
+
+    @staticmethod
+    def install_host(
+        args: Namespace, logger: Logger, rsyncdirector_config: Dict, instances: List[Dict]
+    ) -> None:
+        logger.info(f"Configs.install_host; host={args.installation_host}")
         conn = Utils.get_connection(args.installation_host, args.installation_user)
+        Agent.start(conn, logger, args)
 
         if args.clear_existing_configs:
             Configs.clear_existing_configs(conn, logger, args.installation_host)
@@ -83,92 +261,203 @@ class Configs(ArgParser):
         LinuxDistro.install_packages(conn, distro, ["logrotate", "sudo"])
         logger.info("logrotate installed/verified")
 
-        # Figure out the path to this file so that we can load the require config template files.
-        current_file_path = Path(__file__).resolve()
-        module_dir = current_file_path.parent.parent
-        configs_dir = module_dir / "configs"
-
         # Confirm that python is already installed
-        result = conn.run(f"stat {args.remote_python_path}", warn=True, hide=True)
-        if not result.ok:
+        if not RemoteOps.exists(conn, args.remote_python_path):
             raise Exception(f"python is not installed; expected_path={args.remote_python_path}")
 
         LinuxDistro.create_run_user(conn, args.remote_rsyncdirector_run_user)
-        rsyncdirector_config = Utils.load_yaml_file(args.local_rsyncdirector_config_file_path)
 
         remote_dirs = [REMOTE_LOG_DIR, REMOTE_CONFIG_DIR]
         # Only create another remote dir if there is a pid file dir defined in the config.
         if "pid_file_dir" in rsyncdirector_config:
             remote_dirs.append(rsyncdirector_config["pid_file_dir"])
         for dir in remote_dirs:
-            conn.run(f"mkdir -p {dir}")
-            conn.run(f"chown {args.remote_rsyncdirector_run_user}: {dir}")
-            conn.run(f"chmod 755 {dir}")
+            RemoteOps.mkdir(conn, dir, owner=f"{args.remote_rsyncdirector_run_user}:", mode="755")
 
-        files = []
+        files = Configs.get_files(args, instances)
 
-        config_file_name = Path(args.local_rsyncdirector_config_file_path).name
-        remote_config_path = os.path.join(os.sep, REMOTE_CONFIG_DIR, config_file_name)
-        files.append(
-            {
-                "data": Utils.load_file(args.local_rsyncdirector_config_file_path),
-                "remote_path": os.path.join(os.sep, REMOTE_CONFIG_DIR, config_file_name),
-                "user_group": f"{args.remote_rsyncdirector_run_user}:",
-                "perms": "644",
-            }
+        for file in files:
+            RemoteOps.write_file(
+                conn, file["remote_path"], file["data"], file["user_group"], file["perms"]
+            )
+        removed = Configs.remove_stale_shards(conn, logger, args, instances)
+        # The launcher script deployed by earlier versions, the unit now execs the entry point.
+        RemoteOps.run(
+            conn, ["rm", "-f", os.path.join(os.sep, REMOTE_CONFIG_DIR, "rsyncdirector.sh")]
         )
+        RemoteOps.systemctl(conn, "daemon-reload")
+        RemoteOps.systemctl(conn, "restart", "logrotate")
+        Agent.stop(conn)
+        conn.close()
 
-        # Load, hydrate, and deploy configuration files. Some files have a
-        # 'service_instance_identifier' added to it.  This enables us to run multiple instances of
-        # the rsyncdirector, each with different configs via the same systemd unit file.
-        env_tmpl_path = configs_dir / "etc" / "rsyncdirector" / "rsyncdirector.env.tmpl"
-        env_hydrated = Configs.load_and_hydrate_tmpl(
-            env_tmpl_path, {"config_path": remote_config_path}
-        )
-        files.append(
-            {
-                "data": env_hydrated,
-                "remote_path": os.path.join(
-                    os.sep,
-                    REMOTE_CONFIG_DIR,
-                    f"rsyncdirector-{args.service_instance_identifier}.env",
-                ),
-                "user_group": f"{args.remote_rsyncdirector_run_user}:",
-                "perms": "644",
-            }
+        service_cmd = [
+            "rsyncdirector_deploy",
+            "rsyncdirector",
+            "service",
+            "enable",
+            "--now",
+            "--installation-host",
+            args.installation_host,
+        ]
+        if args.installation_user != "root":
+            service_cmd += ["--installation-user", args.installation_user]
+        service_cmd += ["--instance"] + [instance["id"] for instance in instances]
+        if removed:
+            print(
+                f"\nstopped, disabled and removed the shards [{' '.join(removed)}] that are no "
+                f"longer deployed on host [{args.installation_host}]",
+                flush=True,
+            )
+        print(
+            f"\nrsyncdirector config installation on host [{args.installation_host}] is complete\n"
+            f"run '{shlex.join(service_cmd)}' to start\n"
+            "and enable the instances so that they will start on boot",
+            flush=True,
         )
 
-        logrotate_tmpl_path = configs_dir / "etc" / "logrotate.d" / "rsyncdirector.tmpl"
-        logrotate_hydrated = Configs.load_and_hydrate_tmpl(
-            logrotate_tmpl_path, {"id": args.service_instance_identifier}
-        )
-        files.append(
-            {
-                "data": logrotate_hydrated,
-                "remote_path": os.path.join(
-                    os.sep,
-                    "etc",
-                    "logrotate.d",
-                    f"rsyncdirector-{args.service_instance_identifier}",
-                ),
-                "user_group": "root:",
-                "perms": "644",
-            }
-        )
+    @staticmethod
+    def get_shard_index(args: Namespace, instance_id: str) -> int | None:
+        """
+        Returns the index of the shard if the instance id is that of a shard of the instance, ie:
+        2 for <service-instance-identifier>-2, or None.
+        """
+        prefix = f"{args.service_instance_identifier}-"
+        index = instance_id[len(prefix) :]
+        if not instance_id.startswith(prefix) or not index.isdigit():
+            return None
+        return int(index)
 
-        run_sh_tmpl_path = configs_dir / "etc" / "rsyncdirector" / "rsyncdirector.sh.tmpl"
-        run_sh_hydrated = Configs.load_and_hydrate_tmpl(
-            run_sh_tmpl_path,
-            {"virt_env_parent_dir": args.remote_virt_env_dir},
+    @staticmethod
+    def remove_stale_shards(
+        conn: Connection, logger: Logger, args: Namespace, instances: List[Dict]
+    ) -> List[str]:
+        """
+        Stops, disables and removes the shards of the instance that are deployed on the host but not
+        in the instances, ie: after --shards was lowered, so that they do not keep running the jobs
+        of the previous split.  Only instances whose env file points at the config file of that
+        shard are removed.  Returns the ids of the removed shards.
+        """
+        config_path = Path(args.local_rsyncdirector_config_file_path)
+        deployed = {instance["id"] for instance in instances}
+        result = RemoteOps.run(
+            conn,
+            [
+                "find",
+                REMOTE_CONFIG_DIR,
+                "-maxdepth",
+                "1",
+                "-name",
+                f"rsyncdirector-{args.service_instance_identifier}-*.env",
+            ],
+            warn=True,
         )
-        files.append(
+        removed = []
+        for env_path in sorted(result["stdout"].splitlines()):
+            instance_id = os.path.basename(env_path).removeprefix("rsyncdirector-")
+            instance_id = instance_id.removesuffix(".env")
+            index = Configs.get_shard_index(args, instance_id)
+            if index is None or instance_id in deployed:
+                continue
+            shard_config_path = os.path.join(
+                os.sep, REMOTE_CONFIG_DIR, f"{config_path.stem}-{index}{config_path.suffix}"
+            )
+            if shard_config_path not in (RemoteOps.read_file(conn, env_path) or ""):
+                continue
+            logger.info(
+                f"removing stale shard; host={args.installation_host}, instance={instance_id}"
+            )
+            RemoteOps.systemctl(
+                conn, "disable", "--now", f"rsyncdirector@{instance_id}.service", warn=True
+            )
+            RemoteOps.run(
+                conn,
+                [
+                    "rm",
+                    "-f",
+                    env_path,
+                    shard_config_path,
+                    os.path.join(os.sep, "etc", "logrotate.d", f"rsyncdirector-{instance_id}"),
+                ],
+            )
+            removed.append(instance_id)
+        return removed
+
+    @staticmethod
+    def get_instances(args: Namespace) -> List[Dict]:
+        """
+        Returns the single instance defined by the arguments, deploying the config file as is.
+        """
+        return [
             {
-                "data": run_sh_hydrated,
-                "remote_path": os.path.join(os.sep, REMOTE_CONFIG_DIR, "rsyncdirector.sh"),
-                "user_group": f"{args.remote_rsyncdirector_run_user}:",
-                "perms": "744",
+                "id": args.service_instance_identifier,
+                "config_file_name": Path(args.local_rsyncdirector_config_file_path).name,
+                "config_data": Utils.load_file(args.local_rsyncdirector_config_file_path),
             }
-        )
+        ]
+
+    @staticmethod
+    def get_files(args: Namespace, instances: List[Dict]) -> List[Dict]:
+        """
+        Returns the files that are deployed to the installation host for the instances, with their
+        contents, remote paths, ownership and permissions.
+        """
+        # Figure out the path to this file so that we can load the require config template files.
+        current_file_path = Path(__file__).resolve()
+        module_dir = current_file_path.parent.parent
+        configs_dir = module_dir / "configs"
+
+        files = []
+
+        for instance in instances:
+            remote_config_path = os.path.join(
+                os.sep, REMOTE_CONFIG_DIR, instance["config_file_name"]
+            )
+            files.append(
+                {
+                    "data": instance["config_data"],
+                    "remote_path": remote_config_path,
+                    "user_group": f"{args.remote_rsyncdirector_run_user}:",
+                    "perms": "644",
+                }
+            )
+
+            # Load, hydrate, and deploy configuration files. Some files have a
+            # 'service_instance_identifier' added to it.  This enables us to run multiple instances
+            # of the rsyncdirector, each with different configs via the same systemd unit file.
+            env_tmpl_path = configs_dir / "etc" / "rsyncdirector" / "rsyncdirector.env.tmpl"
+            env_hydrated = Configs.load_and_hydrate_tmpl(
+                env_tmpl_path, {"config_path": remote_config_path}
+            )
+            files.append(
+                {
+                    "data": env_hydrated,
+                    "remote_path": os.path.join(
+                        os.sep,
+                        REMOTE_CONFIG_DIR,
+                        f"rsyncdirector-{instance['id']}.env",
+                    ),
+                    "user_group": f"{args.remote_rsyncdirector_run_user}:",
+                    "perms": "644",
+                }
+            )
+
+            logrotate_tmpl_path = configs_dir / "etc" / "logrotate.d" / "rsyncdirector.tmpl"
+            logrotate_hydrated = Configs.load_and_hydrate_tmpl(
+                logrotate_tmpl_path, {"id": instance["id"]}
+            )
+            files.append(
+                {
+                    "data": logrotate_hydrated,
+                    "remote_path": os.path.join(
+                        os.sep,
+                        "etc",
+                        "logrotate.d",
+                        f"rsyncdirector-{instance['id']}",
+                    ),
+                    "user_group": "root:",
+                    "perms": "644",
+                }
+            )
 
         unit_file_tmpl_path = (
             configs_dir / "etc" / "systemd" / "system" / "rsyncdirector@.service.tmpl"
@@ -178,6 +467,7 @@ class Configs(ArgParser):
             {
                 "user": args.remote_rsyncdirector_run_user,
                 "group": args.remote_rsyncdirector_run_user,
+                "virt_env_dir": args.remote_virt_env_dir,
             },
         )
         files.append(
@@ -190,24 +480,7 @@ class Configs(ArgParser):
                 "perms": "644",
             }
         )
-
-        for file in files:
-            remote_path = file["remote_path"]
-            user_group = file["user_group"]
-            perms = file["perms"]
-            conn.put(StringIO(file["data"]), remote_path)
-            conn.run(f"chown {user_group} {remote_path}")
-            conn.run(f"chmod {perms} {remote_path}")
-        conn.run("systemctl daemon-reload")
-        conn.run("systemctl restart logrotate")
-        conn.close()
-
-        print(
-            f"\nrsyncdirector config installation on host [{args.installation_host}] is complete\n"
-            f"run 'systemctl start rsyncdirector@{args.service_instance_identifier}.service' to start\n"
-            f"and 'systemctl enable rsyncdirector@{args.service_instance_identifier}.service' to ensure it will start on boot",
-            flush=True,
-        )
+        return files
 
     @staticmethod
     def load_and_hydrate_tmpl(tmpl_file_path: Path, data: Dict) -> str:
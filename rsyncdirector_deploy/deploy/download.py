@@ -0,0 +1,228 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from typing import TYPE_CHECKING, Dict
+
+from rsyncdirector_deploy.consts import DOWNLOAD_CONNECTIONS_DEFAULT
+
+if TYPE_CHECKING:
+    from requests import Session
+
+DOWNLOAD_CHUNK_SIZE_DEFAULT = 8 * 1024 * 1024
+DOWNLOAD_ATTEMPTS = 3
+DOWNLOAD_TIMEOUT_SECONDS = 60
+# Size of the reads from the response body and from the downloaded file when hashing it.
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+class Download(object):
+    """
+    Downloads a file with HTTP range requests over a pool of connections, persisting which chunks
+    have been written to a state file next to the partial download so that an interrupted download
+    resumes where it stopped.  Falls back to a single stream when the server does not support range
+    requests.  The digest of the complete file is always verified.
+    """
+
+    @staticmethod
+    def fetch(
+        logger: Logger,
+        url: str,
+        dest_path: str,
+        expected_digest: str,
+        digest_algorithm: str = "md5",
+        connections: int = DOWNLOAD_CONNECTIONS_DEFAULT,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE_DEFAULT,
+    ) -> str:
+        # Deferred so that it is only imported when something is actually downloaded.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        if os.path.exists(dest_path):
+            if Download.get_digest(dest_path, digest_algorithm) == expected_digest:
+                logger.info(f"reusing previously downloaded file; dest_path={dest_path}")
+                return dest_path
+            os.remove(dest_path)
+
+        part_path = f"{dest_path}.part"
+        state_path = f"{dest_path}.state.json"
+
+        with requests.Session() as session:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            # The ranges and lengths are of the bytes of the file, which must not be decoded on the
+            # way, ie: from a gzip Content-Encoding added by the server or a proxy.
+            session.headers["Accept-Encoding"] = "identity"
+
+            remote = Download.get_remote_info(session, url)
+            if remote["ranges"] and connections > 1:
+                state = {
+                    "url": url,
+                    "size": remote["size"],
+                    "etag": remote["etag"],
+                    "chunk_size": chunk_size,
+                    "done": [],
+                }
+                previous = Download.load_state(state_path)
+                if (
+                    previous is not None
+                    and os.path.exists(part_path)
+                    and all(
+                        previous.get(k) == state[k] for k in ["url", "size", "etag", "chunk_size"]
+                    )
+                ):
+                    state["done"] = previous["done"]
+                    logger.info(f"resuming download; url={url}, chunks_done={len(state['done'])}")
+                else:
+                    with open(part_path, "wb") as fh:
+                        fh.truncate(remote["size"])
+                Download.fetch_ranges(logger, session, state, part_path, state_path, connections)
+            else:
+                logger.info(
+                    f"server does not support range requests, downloading as one stream; url={url}"
+                )
+                Download.fetch_stream(session, url, part_path)
+
+        digest = Download.get_digest(part_path, digest_algorithm)
+        if digest != expected_digest:
+            # Start from scratch next time rather than resuming a corrupt file.
+            for path in (part_path, state_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise Exception(
+                f"{digest_algorithm} digests did not match; url={url}, "
+                f"expected={expected_digest}, actual={digest}"
+            )
+        os.replace(part_path, dest_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        logger.info(f"download complete; url={url}, dest_path={dest_path}")
+        return dest_path
+
+    @staticmethod
+    def get_remote_info(session: Session, url: str) -> Dict:
+        """
+        Requests the first byte of the file to determine whether the server supports range requests
+        and the size of the file.  Any response other than a 206 is treated as no support for range
+        requests, ie: a 416 for an empty file, and errors are left to the single stream download.
+        """
+        response = session.get(
+            url, headers={"Range": "bytes=0-0"}, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS
+        )
+        with response:
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code != 206 or "/" not in content_range:
+                return {"ranges": False, "size": None, "etag": None}
+            total = content_range.rsplit("/", 1)[1]
+            if not total.isdigit():
+                return {"ranges": False, "size": None, "etag": None}
+            return {
+                "ranges": True,
+                "size": int(total),
+                "etag": response.headers.get("ETag") or response.headers.get("Last-Modified"),
+            }
+
+    @staticmethod
+    def fetch_ranges(
+        logger: Logger,
+        session: Session,
+        state: Dict,
+        part_path: str,
+        state_path: str,
+        connections: int,
+    ) -> None:
+        size = state["size"]
+        chunk_size = state["chunk_size"]
+        done = set(state["done"])
+        pending = [i for i in range((size + chunk_size - 1) // chunk_size) if i not in done]
+        lock = threading.Lock()
+
+        fd = os.open(part_path, os.O_WRONLY)
+        try:
+
+            def fetch_chunk(index: int) -> None:
+                start = index * chunk_size
+                end = min(start + chunk_size, size) - 1
+                for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+                    try:
+                        Download.fetch_range(session, state["url"], fd, start, end)
+                        break
+                    except Exception as e:
+                        if attempt == DOWNLOAD_ATTEMPTS:
+                            raise
+                        logger.warning(
+                            f"downloading range failed, retrying; url={state['url']}, "
+                            f"start={start}, end={end}, attempt={attempt}, exception={e}"
+                        )
+                with lock:
+                    done.add(index)
+                    state["done"] = sorted(done)
+                    Download.save_state(state_path, state)
+
+            with ThreadPoolExecutor(max_workers=connections) as executor:
+                # Consume the results so that the first failed chunk is raised.
+                list(executor.map(fetch_chunk, pending))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def fetch_range(session: Session, url: str, fd: int, start: int, end: int) -> None:
+        response = session.get(
+            url,
+            headers={"Range": f"bytes={start}-{end}"},
+            stream=True,
+            timeout=DOWNLOAD_TIMEOUT_SECONDS,
+        )
+        with response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise Exception(f"server ignored the range request; url={url}, start={start}")
+            offset = start
+            for data in response.iter_content(chunk_size=READ_BUFFER_SIZE):
+                os.pwrite(fd, data, offset)
+                offset += len(data)
+        if offset != end + 1:
+            raise Exception(
+                f"short range response; url={url}, start={start}, end={end}, received={offset - start}"
+            )
+
+    @staticmethod
+    def fetch_stream(session: Session, url: str, part_path: str) -> None:
+        response = session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS)
+        with response:
+            response.raise_for_status()
+            with open(part_path, "wb") as fh:
+                for data in response.iter_content(chunk_size=READ_BUFFER_SIZE):
+                    fh.write(data)
+
+    @staticmethod
+    def get_digest(path: str, digest_algorithm: str) -> str:
+        with open(path, "rb") as fh:
+            return hashlib.file_digest(fh, digest_algorithm).hexdigest()
+
+    @staticmethod
+    def load_state(state_path: str) -> Dict | None:
+        try:
+            with open(state_path, "r") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def save_state(state_path: str, state: Dict) -> None:
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(state, fh)
+        os.replace(tmp_path, state_path)
@@ -4,21 +4,31 @@
 # Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
 # All rights reserved.
 
+from __future__ import annotations
+
 import getpass
 import json
 import os
-from argparse import ArgumentDefaultsHelpFormatter, Namespace
+import time
+from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser, Namespace
 from contextlib import contextmanager
 from logging import Logger
 from pathlib import Path
-from typing import List
-
-from fabric import Connection
+from typing import TYPE_CHECKING, List
 
 from rsyncdirector_deploy.argparser import ArgParser
+from rsyncdirector_deploy.deploy.agent import Agent, RemoteOps
+from rsyncdirector_deploy.deploy.installer import (
+    INSTALLER_DEFAULT,
+    REMOTE_UV_CACHE_DIR_DEFAULT,
+    Installer,
+)
 from rsyncdirector_deploy.deploy.linux import LinuxDistro
 from rsyncdirector_deploy.deploy.utils import Utils
 
+if TYPE_CHECKING:
+    from fabric import Connection
+
 REMOTE_VIRT_ENV_PARENT_DIR = "/usr/local"
 
 
@@ -39,6 +49,55 @@ class Install(ArgParser):
             formatter_class=ArgumentDefaultsHelpFormatter,
         )
 
+        # Add args common to all install methods.
+        cold_start_samples_arg = ArgumentParser(add_help=False)
+        cold_start_samples_arg.add_argument(
+            "--cold-start-samples",
+            "-a",
+            type=int,
+            default=5,
+            help=(
+                "Number of times to start rsyncdirector's interpreter and import it to measure the "
+                "cold-start time of each service instance after the install.  0 disables the "
+                "measurement"
+            ),
+        )
+        installer_args = ArgumentParser(add_help=False)
+        installer_args.add_argument(
+            "--installer",
+            "-b",
+            type=str,
+            choices=["auto", "uv", "pip"],
+            default=INSTALLER_DEFAULT,
+            help=(
+                "Backend with which to create the virtual env and install the packages.  'auto' "
+                "uses uv when --uv-binary-path is provided or uv is on the installation host's "
+                "PATH, and pip otherwise"
+            ),
+        )
+        installer_args.add_argument(
+            "--uv-binary-path",
+            "-y",
+            type=str,
+            default=None,
+            help=(
+                "Path on the local host to a uv binary for the installation hosts' platform, ie: "
+                "the statically linked x86_64-unknown-linux-musl build.  It is uploaded to the "
+                "installation host if it is not already there"
+            ),
+        )
+        installer_args.add_argument(
+            "--uv-cache-dir",
+            "-z",
+            type=str,
+            default=REMOTE_UV_CACHE_DIR_DEFAULT,
+            help=(
+                "Persistent uv cache dir on the installation host.  Packages are hardlinked from it "
+                "into the virtual env when both are on the same filesystem"
+            ),
+        )
+        parents = parents + [cold_start_samples_arg, installer_args]
+
         # Create subparsers for different install methods.
         install_subparsers = Install.parser.add_subparsers(
             dest="install_method", help="Choose installation method", required=True
@@ -101,52 +160,70 @@ class Install(ArgParser):
 
     @staticmethod
     def create_virtualenv(
-        conn: Connection, logger: Logger, python_path: str, path: str, user: str
+        conn: Connection,
+        logger: Logger,
+        installer: Installer,
+        python_path: str,
+        path: str,
+        user: str,
     ) -> None:
         Utils.delete_dir(conn, logger, path, "removing and recreating virtual environment")
         # result = conn.run(f"{python_path} -mvenv {path}", warn=True)
-        result = conn.run(f"mkdir -p {path}", warn=True, hide=True)
-        if result is None or not result.ok:
-            raise Exception(f"creating virtual env directory; path={path}, result={result}")
-        result = conn.run(f"chown {user}: {path}")
-        if result is None or not result.ok:
-            raise Exception(
-                f"chowning virtual env directory; path={path}, user={user}, result={result}"
-            )
-        result = conn.sudo(f"{python_path} -mvenv {path}", warn=True, user=user)
-        if not result.ok:
+        try:
+            RemoteOps.mkdir(conn, path, owner=f"{user}:")
+        except Exception as e:
             raise Exception(
-                f"creating virtual env; python_path={python_path}, path={path}, result={result}"
+                f"creating virtual env directory; path={path}, user={user}, exception={e}"
             )
+        installer.create_virtualenv(conn, python_path, path, user)
 
     @staticmethod
     def install(args: Namespace, logger: Logger) -> None:
         logger.info("Install.install")
+        Utils.check_required_args(args, ["remote_python_path"])
         conn = Utils.get_connection(args.installation_host, args.installation_user)
+        Agent.start(conn, logger, args)
 
         # Ensure that the required user and groups exist
         LinuxDistro.create_run_user(conn, args.remote_rsyncdirector_run_user)
         Install.stop_all_service_units(logger, conn)
+
+        installer = Installer.get_installer(conn, logger, args)
+        start = time.monotonic()
         Install.create_virtualenv(
             conn,
             logger,
+            installer,
             args.remote_python_path,
             args.remote_virt_env_dir,
             args.remote_rsyncdirector_run_user,
         )
 
-        # Just call the virt env pip command directly to avoid having to source the virtl env
-        # activate script.
-        venv_pip = f"{args.remote_virt_env_dir}/bin/pip"
-
         match args.install_method:
             case "package-index":
-                Install.install_from_package_index(args, logger, conn, venv_pip)
+                Install.install_from_package_index(args, logger, conn, installer)
             case "wheel":
-                Install.install_from_wheel(args, logger, conn, venv_pip)
+                Install.install_from_wheel(args, logger, conn, installer)
             case _:
                 raise Exception(f"invalid install method; install_method={args.install_method}")
+        logger.info(
+            f"rsyncdirector installed; installer={installer.name}, "
+            f"seconds={time.monotonic() - start:.1f}"
+        )
+
+        Install.precompile_virtualenv(
+            conn, logger, args.remote_virt_env_dir, args.remote_rsyncdirector_run_user
+        )
+        if args.cold_start_samples > 0:
+            Install.measure_cold_start(
+                conn,
+                logger,
+                args.remote_virt_env_dir,
+                args.remote_rsyncdirector_run_user,
+                args.cold_start_samples,
+            )
 
+        Agent.stop(conn)
         conn.close()
 
     @staticmethod
@@ -154,7 +231,7 @@ class Install(ArgParser):
         args: Namespace,
         logger: Logger,
         conn: Connection,
-        venv_pip: str,
+        installer: Installer,
     ) -> None:
         # We will use the following URL if we do not have to add uid and passwd.
         url = args.package_index_url
@@ -179,42 +256,91 @@ class Install(ArgParser):
             )
 
         pkg = f"rsyncdirector=={args.version}" if args.version != "latest" else "rsyncdirector"
-        pip_opts = []
-        if url:
-            pip_opts = [f"--index-url {url}"]
-        if args.trusted_host:
-            pip_opts.append(f"--trusted-host {args.trusted_host}")
-        pip_opts = " ".join(pip_opts)
-        pip_cmd = f"{venv_pip} install {pkg} {pip_opts}"
-        conn.sudo(
-            pip_cmd,
-            user=args.remote_rsyncdirector_run_user,
+        installer.install(
+            conn,
+            args.remote_virt_env_dir,
+            args.remote_rsyncdirector_run_user,
+            pkg,
+            index_url=url,
+            trusted_host=args.trusted_host,
             env={"INDEX_UID": username, "INDEX_PASSWD": password},
         )
 
     @staticmethod
     def install_from_wheel(
-        args: Namespace, logger: Logger, conn: Connection, venv_pip: str
+        args: Namespace, logger: Logger, conn: Connection, installer: Installer
     ) -> None:
+        from rsyncdirector_deploy.deploy.transfer import Transfer
+
         local_whl_file_name = Path(args.local_whl_file_path).name
         remote_whl_file_path = os.path.join(os.path.sep, "var", "tmp", local_whl_file_name)
-        conn.put(args.local_whl_file_path, remote_whl_file_path)
-        conn.sudo(
-            f"{venv_pip} install {remote_whl_file_path}", user=args.remote_rsyncdirector_run_user
+        Transfer.put(
+            conn,
+            logger,
+            args.local_whl_file_path,
+            remote_whl_file_path,
+            method=args.transfer_method,
+            connections=args.transfer_connections,
+        )
+        installer.install(
+            conn, args.remote_virt_env_dir, args.remote_rsyncdirector_run_user, remote_whl_file_path
         )
         conn.run(f"rm {remote_whl_file_path}")
 
+    @staticmethod
+    def precompile_virtualenv(conn: Connection, logger: Logger, path: str, user: str) -> None:
+        # Compile the bytecode for rsyncdirector and all of its dependencies, using all of the
+        # cores, so that service instances do not compile it on their first start, and so that it is
+        # written by the user that owns the virtual env.
+        result = conn.sudo(
+            f"{path}/bin/python -m compileall -q -j 0 {path}", user=user, warn=True, hide=True
+        )
+        if not result.ok:
+            # compileall exits non-zero if any single file fails to compile, ie: test fixtures with
+            # intentionally invalid syntax.  Everything else is still compiled.
+            logger.warning(f"not all files in the virtual env were compiled; result={result}")
+        else:
+            logger.info(f"virtual env bytecode precompiled; path={path}")
+
+    @staticmethod
+    def measure_cold_start(
+        conn: Connection, logger: Logger, path: str, user: str, samples: int
+    ) -> None:
+        remote_script_path = Utils.put_remote_script(conn, "cold_start.py")
+        result = conn.sudo(
+            f"{path}/bin/python {remote_script_path} --samples {samples}",
+            user=user,
+            warn=True,
+            hide=True,
+        )
+        if not result.ok:
+            logger.warning(f"measuring rsyncdirector cold-start time failed; result={result}")
+            return
+
+        report = json.loads(result.stdout)
+        print(
+            f"\nrsyncdirector service instance cold-start on host [{conn.host}]\n"
+            f"  precompiled: first {report['precompiled']['first_ms']:.0f} ms, "
+            f"median {report['precompiled']['median_ms']:.0f} ms\n"
+            f"  without bytecode cache: median {report['from_source']['median_ms']:.0f} ms",
+            flush=True,
+        )
+
     @staticmethod
     def stop_all_service_units(logger: Logger, conn: Connection) -> None:
-        result = conn.run("systemctl list-units 'rsyncdirector@*.service' --output=json-pretty", warn=True, hide=True)
-        if result is None or not result.ok:
+        result = RemoteOps.systemctl(
+            conn, "list-units", "rsyncdirector@*.service", "--output=json-pretty", warn=True
+        )
+        if result["exit_code"] != 0:
             raise Exception(f"getting list of all rsyncdirector service units, result={result}")
-        units = json.loads(result.stdout)
+        units = json.loads(result["stdout"])
 
+        unit_names = []
         for unit in units:
             if "unit" not in unit:
                 logger.warning(f"unit entry did not have a 'unit' key, skipping; unit={unit}")
                 continue
             logger.info(f"stopping unit; unit={unit}")
-            unit_name = unit["unit"]
-            conn.run(f"systemctl stop {unit_name}")
+            unit_names.append(unit["unit"])
+        if unit_names:
+            RemoteOps.systemctl(conn, "stop", *unit_names)
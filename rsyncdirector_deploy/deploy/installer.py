@@ -0,0 +1,178 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import os
+from abc import ABC, abstractmethod
+from argparse import Namespace
+from logging import Logger
+from typing import TYPE_CHECKING, Dict, List
+
+from rsyncdirector_deploy.consts import REMOTE_TOOLS_DIR
+
+if TYPE_CHECKING:
+    from fabric import Connection
+
+INSTALLER_DEFAULT = "auto"
+REMOTE_UV_CACHE_DIR_DEFAULT = "/var/cache/rsyncdirector_deploy/uv"
+
+
+class Installer(ABC):
+    """
+    Creates the virtual env and installs packages into it on the installation host.  Each backend
+    runs its commands as the user that owns the virtual env.
+    """
+
+    name = None
+
+    @abstractmethod
+    def create_virtualenv(self, conn: Connection, python_path: str, path: str, user: str) -> None:
+        pass
+
+    @abstractmethod
+    def install(
+        self,
+        conn: Connection,
+        path: str,
+        user: str,
+        requirement: str,
+        index_url: str | None = None,
+        trusted_host: str | None = None,
+        env: Dict[str, str] | None = None,
+    ) -> None:
+        pass
+
+    @staticmethod
+    def get_installer(conn: Connection, logger: Logger, args: Namespace) -> Installer:
+        """
+        Returns the backend selected by --installer.  'auto' uses uv when a uv binary was provided,
+        or is already on the installation host, and pip otherwise.
+        """
+        if args.installer == "pip":
+            return PipInstaller()
+
+        uv_path = UvInstaller.get_remote_uv(conn, logger, args, args.uv_binary_path)
+        if uv_path is None:
+            if args.installer == "uv":
+                raise Exception(
+                    "uv is not available on the installation host, provide --uv-binary-path; "
+                    f"host={conn.host}"
+                )
+            logger.info(f"uv not available, installing with pip; host={conn.host}")
+            return PipInstaller()
+        return UvInstaller(uv_path, args.uv_cache_dir)
+
+
+class PipInstaller(Installer):
+
+    name = "pip"
+
+    def create_virtualenv(self, conn: Connection, python_path: str, path: str, user: str) -> None:
+        result = conn.sudo(f"{python_path} -mvenv {path}", warn=True, user=user)
+        if not result.ok:
+            raise Exception(
+                f"creating virtual env; python_path={python_path}, path={path}, result={result}"
+            )
+
+    def install(
+        self,
+        conn: Connection,
+        path: str,
+        user: str,
+        requirement: str,
+        index_url: str | None = None,
+        trusted_host: str | None = None,
+        env: Dict[str, str] | None = None,
+    ) -> None:
+        # Just call the virt env pip command directly to avoid having to source the virtl env
+        # activate script.
+        pip_opts = []
+        if index_url:
+            pip_opts.append(f"--index-url {index_url}")
+        if trusted_host:
+            pip_opts.append(f"--trusted-host {trusted_host}")
+        conn.sudo(
+            f"{path}/bin/pip install {requirement} {' '.join(pip_opts)}", user=user, env=env or {}
+        )
+
+
+class UvInstaller(Installer):
+    """
+    Installs with uv, resolving and installing from a persistent cache on the installation host.
+    Packages are hardlinked from the cache into the virtual env, which requires that the cache and
+    the virtual env are on the same filesystem; uv copies them otherwise.
+    """
+
+    name = "uv"
+
+    def __init__(self, uv_path: str, cache_dir: str):
+        self.uv_path = uv_path
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def get_remote_uv(
+        conn: Connection, logger: Logger, args: Namespace, local_uv_path: str | None
+    ) -> str | None:
+        """
+        Uploads the local uv binary, unless the same binary is already on the installation host,
+        and returns its remote path.  Without a local binary, returns the path of the uv on the
+        installation host's PATH, if any.
+        """
+        from rsyncdirector_deploy.deploy.transfer import Transfer
+
+        if local_uv_path is None:
+            result = conn.run("command -v uv", warn=True, hide=True)
+            return result.stdout.strip() if result.ok else None
+
+        remote_uv_path = os.path.join(REMOTE_TOOLS_DIR, "uv")
+        stats = Transfer.put(
+            conn,
+            logger,
+            local_uv_path,
+            remote_uv_path,
+            method=args.transfer_method,
+            connections=args.transfer_connections,
+            mode=0o755,
+        )
+        if not stats["skipped"]:
+            logger.info(f"uv uploaded; host={conn.host}, path={remote_uv_path}")
+        return remote_uv_path
+
+    def prepare_cache_dir(self, conn: Connection, user: str) -> None:
+        conn.run(f"mkdir -p {self.cache_dir} && chown {user}: {self.cache_dir}")
+
+    def get_uv_cmd(self, args: List[str]) -> str:
+        return f"{self.uv_path} {' '.join(args)} --cache-dir {self.cache_dir} --no-progress"
+
+    def create_virtualenv(self, conn: Connection, python_path: str, path: str, user: str) -> None:
+        self.prepare_cache_dir(conn, user)
+        # Only use the given interpreter, never one downloaded or found elsewhere by uv.
+        cmd = self.get_uv_cmd(["venv", "--python", python_path, "--no-python-downloads", path])
+        result = conn.sudo(cmd, warn=True, user=user)
+        if not result.ok:
+            raise Exception(
+                f"creating virtual env; python_path={python_path}, path={path}, result={result}"
+            )
+
+    def install(
+        self,
+        conn: Connection,
+        path: str,
+        user: str,
+        requirement: str,
+        index_url: str | None = None,
+        trusted_host: str | None = None,
+        env: Dict[str, str] | None = None,
+    ) -> None:
+        self.prepare_cache_dir(conn, user)
+        uv_args = ["pip", "install", "--python", f"{path}/bin/python", "--link-mode", "hardlink"]
+        if index_url:
+            uv_args.append(f"--index-url {index_url}")
+        if trusted_host:
+            uv_args.append(f"--allow-insecure-host {trusted_host}")
+        uv_args.append(requirement)
+        conn.sudo(self.get_uv_cmd(uv_args), user=user, env=env or {})
@@ -0,0 +1,310 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+from argparse import Action, ArgumentParser, ArgumentTypeError, Namespace
+from typing import Dict, List, Set
+
+from rsyncdirector_deploy.deploy.utils import Utils
+
+INVENTORY_CACHE_VERSION = 1
+
+
+class Inventory(object):
+    """
+    A resolved view of an inventory file.
+
+    The inventory is a YAML file with optional global `vars`, `groups` and `hosts` sections. Each
+    group can define `vars` and `hosts` and each host can define its own vars. Variable names are
+    the `dest` names of the command line arguments, ie: `remote_python_path` for
+    `--remote-python-path`, and dashes are accepted in place of underscores. Vars are merged in the
+    following order, the later overriding the former: global vars, group vars (in the order in which
+    the groups are defined), host vars.  Any argument explicitly provided on the command line
+    overrides all of them.  Vars are converted with the type of their argument, and checked against
+    its choices, when the hosts' args are resolved.
+
+        vars:
+          remote_python_path: /usr/local/python-3.13.11/bin/python3
+        groups:
+          storage:
+            vars:
+              remote_rsyncdirector_run_user: root
+            hosts:
+              storage01.example.com:
+              storage02.example.com:
+                service_instance_identifier: nightly
+        hosts:
+          web01.example.com:
+            installation_host: 10.0.0.21
+
+    The resolved model is cached on the local host, keyed on the path, mtime and size of the
+    inventory file, so that it is only parsed and resolved again when the file changes.
+    """
+
+    def __init__(self, hosts: Dict[str, Dict], groups: Dict[str, List[str]]):
+        # Host names, in the order in which they are defined, mapped to their resolved vars.
+        self.hosts = hosts
+        # Group names mapped to the list of host names in the group.
+        self.groups = groups
+
+    @staticmethod
+    def load(path: str) -> Inventory:
+        path = os.path.abspath(os.path.expanduser(path))
+        stat = os.stat(path)
+        cache_path = Inventory.get_cache_path(path)
+
+        try:
+            with open(cache_path, "r") as fh:
+                cached = json.load(fh)
+            if (
+                cached["version"] == INVENTORY_CACHE_VERSION
+                and cached["mtime_ns"] == stat.st_mtime_ns
+                and cached["size"] == stat.st_size
+            ):
+                return Inventory(cached["hosts"], cached["groups"])
+        except (OSError, ValueError, KeyError):
+            # A missing, stale or corrupt cache file is simply rebuilt.
+            pass
+
+        inventory = Inventory.resolve(Utils.load_yaml_file(path) or {}, path)
+        cached = {
+            "version": INVENTORY_CACHE_VERSION,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hosts": inventory.hosts,
+            "groups": inventory.groups,
+        }
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(cached, fh, default=str)
+        os.replace(tmp_path, cache_path)
+        return inventory
+
+    @staticmethod
+    def resolve(data: Dict, path: str) -> Inventory:
+        if not isinstance(data, dict):
+            raise Exception(f"inventory must be a mapping; path={path}")
+
+        global_vars = Inventory.normalize_vars(data.get("vars"), f"{path}:vars")
+        groups = {}
+        group_vars = {}
+        host_vars = {}
+
+        for group_name, group in (data.get("groups") or {}).items():
+            group = group or {}
+            if not isinstance(group, dict):
+                raise Exception(
+                    f"inventory group must be a mapping; path={path}, group={group_name}"
+                )
+            group_vars[group_name] = Inventory.normalize_vars(
+                group.get("vars"), f"{path}:groups.{group_name}.vars"
+            )
+            groups[group_name] = []
+            for host_name, entries in (group.get("hosts") or {}).items():
+                groups[group_name].append(host_name)
+                host_vars.setdefault(host_name, {}).update(
+                    Inventory.normalize_vars(
+                        entries, f"{path}:groups.{group_name}.hosts.{host_name}"
+                    )
+                )
+
+        for host_name, entries in (data.get("hosts") or {}).items():
+            host_vars.setdefault(host_name, {}).update(
+                Inventory.normalize_vars(entries, f"{path}:hosts.{host_name}")
+            )
+
+        # Index each host's groups once so that resolution is linear in the size of the inventory.
+        host_groups = {host_name: [] for host_name in host_vars}
+        for group_name, members in groups.items():
+            for host_name in members:
+                host_groups[host_name].append(group_name)
+
+        hosts = {}
+        for host_name, entries in host_vars.items():
+            resolved = {"installation_host": host_name}
+            resolved.update(global_vars)
+            for group_name in host_groups[host_name]:
+                resolved.update(group_vars[group_name])
+            resolved.update(entries)
+            hosts[host_name] = resolved
+
+        groups["all"] = list(hosts.keys())
+        return Inventory(hosts, groups)
+
+    @staticmethod
+    def normalize_vars(entries: Dict | None, context: str) -> Dict:
+        if entries is None:
+            return {}
+        if not isinstance(entries, dict):
+            raise Exception(f"inventory vars must be a mapping; context={context}")
+        return {str(k).replace("-", "_"): v for k, v in entries.items()}
+
+    @staticmethod
+    def get_cache_path(path: str) -> str:
+        key = hashlib.sha256(path.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(Utils.get_local_cache_dir("inventory"), f"{key}.json")
+
+    def select(self, limit: str | None) -> List[str]:
+        """
+        Returns the names of the hosts matched by the comma-separated list of patterns in `limit`.
+
+        Each pattern is either a group name or a shell-style wildcard matched against the host
+        names. A pattern prefixed with '!' excludes the hosts that it matches. If there are only
+        exclusion patterns, or no patterns at all, they are applied to all of the hosts.
+        """
+        patterns = [p.strip() for p in (limit or "").split(",") if p.strip()]
+        includes = [p for p in patterns if not p.startswith("!")]
+        excludes = [p[1:] for p in patterns if p.startswith("!")]
+
+        selected = set(self.hosts) if not includes else self.match(includes)
+        selected -= self.match(excludes)
+        # Preserve the order in which the hosts are defined in the inventory.
+        return [host_name for host_name in self.hosts if host_name in selected]
+
+    def match(self, patterns: List[str]) -> Set[str]:
+        retval = set()
+        for pattern in patterns:
+            if pattern in self.groups:
+                retval.update(self.groups[pattern])
+            elif pattern in self.hosts:
+                retval.add(pattern)
+            else:
+                retval.update(fnmatch.filter(self.hosts, pattern))
+        return retval
+
+    def get_host_args(
+        self,
+        host_name: str,
+        args: Namespace,
+        explicit_dests: Set[str],
+        actions: Dict[str, Action],
+        known_dests: Set[str],
+    ) -> Namespace:
+        """
+        Returns the args of the host, with its vars converted and validated as argparse would have
+        the same values provided on the command line.  Vars of the arguments of other subcommands
+        are ignored, vars that are not the dest of any argument are rejected.
+        """
+        host_args = Namespace(**vars(args))
+        for k, v in self.hosts[host_name].items():
+            if k not in known_dests:
+                raise Exception(f"unknown inventory var; host={host_name}, var={k}")
+            if k in explicit_dests or k not in actions:
+                continue
+            try:
+                value = Inventory.convert_value(actions[k], v)
+            except (ArgumentTypeError, TypeError, ValueError) as e:
+                raise Exception(
+                    f"invalid inventory var; host={host_name}, var={k}, value={v}, error={e}"
+                )
+            setattr(host_args, k, value)
+        return host_args
+
+    @staticmethod
+    def convert_value(action: Action, value):
+        """
+        Returns the value of an inventory var converted with the type of its argument and checked
+        against its choices.  A scalar given for an argument that takes a list, ie: one that is
+        appended to or takes nargs, is wrapped in a list.
+        """
+        if value is None:
+            return None
+        if action.nargs == 0:
+            # Flags, ie: store_true.
+            if not isinstance(value, bool):
+                raise TypeError("expected true or false")
+            return value
+
+        takes_list = isinstance(action, argparse._AppendAction) or action.nargs not in (None, "?")
+        if takes_list and not isinstance(value, list):
+            value = [value]
+        elif not takes_list and isinstance(value, (list, dict)):
+            raise TypeError("expected a single value")
+
+        def convert(item):
+            if isinstance(item, (list, dict)):
+                raise TypeError("expected a single value")
+            # Converted from the string, as on the command line.
+            item = action.type(str(item)) if action.type is not None else str(item)
+            if action.choices is not None and item not in action.choices:
+                raise ValueError(f"expected one of {list(action.choices)}")
+            return item
+
+        return [convert(item) for item in value] if takes_list else convert(value)
+
+    @staticmethod
+    def get_targets(args: Namespace, parser: ArgumentParser, argv: List[str]) -> List[Namespace]:
+        """
+        Returns one Namespace per host on which the selected subcommand is to be run.
+        """
+        if getattr(args, "inventory", None) is None:
+            return [args]
+
+        inventory = Inventory.load(args.inventory)
+        host_names = inventory.select(args.limit)
+        if not host_names:
+            raise Exception(
+                f"no hosts in inventory matched; inventory={args.inventory}, limit={args.limit}"
+            )
+        explicit_dests = Inventory.get_explicit_dests(parser, argv)
+        actions = {a.dest: a for a in Inventory.get_subcommand_parser(parser, argv)._actions}
+        known_dests = Inventory.get_all_dests(parser)
+        return [
+            inventory.get_host_args(h, args, explicit_dests, actions, known_dests)
+            for h in host_names
+        ]
+
+    @staticmethod
+    def get_subcommand_parser(parser: ArgumentParser, argv: List[str]) -> ArgumentParser:
+        """
+        Walks down the tree of subparsers to the parser that handles the selected subcommand as
+        that is the only one that knows about all of its arguments.
+        """
+        current = parser
+        for token in argv:
+            subparsers = [a for a in current._actions if isinstance(a, argparse._SubParsersAction)]
+            if subparsers and token in subparsers[0].choices:
+                current = subparsers[0].choices[token]
+        return current
+
+    @staticmethod
+    def get_all_dests(parser: ArgumentParser) -> Set[str]:
+        """
+        Returns the dest names of the arguments of every subcommand in the tree of subparsers.
+        """
+        retval = set()
+        for action in parser._actions:
+            if isinstance(action, argparse._SubParsersAction):
+                for subparser in action.choices.values():
+                    retval |= Inventory.get_all_dests(subparser)
+            else:
+                retval.add(action.dest)
+        return retval
+
+    @staticmethod
+    def get_explicit_dests(parser: ArgumentParser, argv: List[str]) -> Set[str]:
+        """
+        Returns the dest names of the arguments that were explicitly provided on the command line so
+        that inventory vars only override the argparse defaults.
+        """
+        retval = set()
+        option_string_actions = Inventory.get_subcommand_parser(parser, argv)._option_string_actions
+        for token in argv:
+            if not token.startswith("-"):
+                continue
+            option_string = token.split("=", 1)[0]
+            if option_string in option_string_actions:
+                retval.add(option_string_actions[option_string].dest)
+            elif not token.startswith("--") and token[:2] in option_string_actions:
+                # A short option with its value attached, ie: -ohost
+                retval.add(option_string_actions[token[:2]].dest)
+        return retval
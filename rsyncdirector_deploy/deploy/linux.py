@@ -6,8 +6,12 @@
 
 from __future__ import annotations
 from enum import Enum
-from fabric import Connection
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Tuple
+
+from rsyncdirector_deploy.deploy.agent import RemoteOps
+
+if TYPE_CHECKING:
+    from fabric import Connection
 
 
 class LinuxDistro(Enum):
@@ -25,10 +29,10 @@ class LinuxDistro(Enum):
     @staticmethod
     def create_group(conn: Connection, group: str) -> Tuple[bool, int]:
         def get_group_id(group: str) -> Tuple[bool, int]:
-            result = conn.run(f"getent group {group}", warn=True, hide=True)
-            if result.ok:
+            entry = RemoteOps.getent(conn, "group", group)
+            if entry is not None:
                 # We only need the group name and gid fields
-                group_name, _, group_id, _ = result.stdout.split(":", 3)
+                group_name, _, group_id = entry[:3]
                 # The group provided and the one found has to match
                 if group == group_name:
                     return True, int(group_id)
@@ -55,8 +59,7 @@ class LinuxDistro(Enum):
             return
 
         def does_user_exist(user_name: str) -> bool:
-            result = conn.run(f"getent passwd {user_name}", warn=True, hide=True)
-            return result.ok
+            return RemoteOps.getent(conn, "passwd", user_name) is not None
 
         success, group_id = LinuxDistro.create_group(conn, user_name)
         if success and group_id > 0:
@@ -82,12 +85,12 @@ class LinuxDistro(Enum):
 
     @staticmethod
     def get_linux_distro(conn: Connection) -> LinuxDistro:
-        result = conn.run("cat /etc/os-release")
-        if not result.ok:
+        os_release = RemoteOps.read_file(conn, "/etc/os-release")
+        if os_release is None:
             return LinuxDistro.UNKNOWN
 
         retval = LinuxDistro.UNKNOWN
-        stdout = result.stdout.strip()
+        stdout = os_release.strip()
         lines = stdout.splitlines()
         for line in lines:
             tokens = line.split("=")
@@ -0,0 +1,162 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import json
+import shlex
+from argparse import ArgumentDefaultsHelpFormatter, Namespace
+from logging import Logger
+from typing import Dict, List
+
+from rsyncdirector_deploy.argparser import ArgParser
+from rsyncdirector_deploy.deploy.configs import Configs
+from rsyncdirector_deploy.deploy.rsyncdirector_config import RsyncDirectorConfig
+from rsyncdirector_deploy.deploy.utils import Utils
+
+# Compression is only recommended when it is at least this much faster than no compression, as it
+# also costs CPU on both ends.
+COMPRESSION_MIN_SPEEDUP = 1.1
+MAX_RECOMMENDED_PARALLELISM = 8
+
+
+class Preflight(ArgParser):
+
+    parser = None
+
+    def __init__(self):
+        super().__init__()
+
+    @staticmethod
+    def add_args(subparsers, parents=[]):
+        Preflight.parser = subparsers.add_parser(
+            "preflight",
+            help=(
+                "Measure the RTT and SSH throughput from each installation host to the sync targets "
+                "in its rsyncdirector config, and the read throughput of its sync sources, and "
+                "recommend rsync compression and parallelism"
+            ),
+            parents=parents + [Configs.get_instance_args()],
+            formatter_class=ArgumentDefaultsHelpFormatter,
+        )
+        Preflight.parser.add_argument(
+            "--sample-mb",
+            "-m",
+            type=int,
+            default=32,
+            help="Megabytes of source data sent to each target over SSH with each compression setting",
+        )
+        Preflight.parser.add_argument(
+            "--read-mb",
+            "-r",
+            type=int,
+            default=512,
+            help="Maximum megabytes of source data read to measure the local read throughput",
+        )
+        Preflight.parser.add_argument(
+            "--rtt-samples",
+            "-t",
+            type=int,
+            default=5,
+            help="Number of TCP connections made to each target to measure the RTT",
+        )
+        Preflight.parser.set_defaults(func=Preflight.preflight, fleet=True)
+
+    @staticmethod
+    def preflight(targets: List[Namespace], logger: Logger) -> None:
+        logger.info(f"Preflight.preflight; num_hosts={len(targets)}")
+        specs = []
+        for args in targets:
+            Utils.check_required_args(
+                args, ["local_rsyncdirector_config_file_path", "remote_python_path"]
+            )
+            specs.append(
+                Preflight.get_spec(
+                    args, RsyncDirectorConfig.load(args.local_rsyncdirector_config_file_path)
+                )
+            )
+        spec_by_host = {args.installation_host: spec for args, spec in zip(targets, specs)}
+
+        results = Utils.run_concurrently(
+            targets,
+            lambda args: Preflight.run_host(args, spec_by_host[args.installation_host]),
+            targets[0].parallelism,
+        )
+
+        print(
+            f"{'HOST':<24} {'TARGET':<32} {'RTT_MS':>7} {'SETUP_MS':>8} {'SSH_MB/S':>8} "
+            f"{'SSH_Z_MB/S':>10} {'READ_MB/S':>9}  RECOMMENDATION"
+        )
+        for args, result, e in results:
+            host = args.installation_host
+            if e is not None:
+                logger.error(f"preflight failed; host={host}, exception={e}")
+                print(f"{host:<24} error: {e}")
+                continue
+            read_mb_s = result["read"]["mb_s"]
+            for target in result["targets"]:
+                if "error" in target:
+                    print(f"{host:<24} {target['target']:<32} error: {target['error']}")
+                    continue
+                ssh = target["ssh"]
+                print(
+                    f"{host:<24} {target['target']:<32} {target['rtt']['median_ms']:>7.1f} "
+                    f"{ssh['setup_ms']:>8.0f} {ssh['uncompressed_mb_s']:>8.1f} "
+                    f"{ssh['compressed_mb_s']:>10.1f} "
+                    f"{read_mb_s if read_mb_s is None else round(read_mb_s, 1)!s:>9}  "
+                    f"{Preflight.get_recommendation(ssh, read_mb_s)}"
+                )
+
+    @staticmethod
+    def get_spec(args: Namespace, rsyncdirector_config: Dict) -> Dict:
+        sync_targets = {}
+        sources = []
+        for job in rsyncdirector_config["jobs"]:
+            for action in job["actions"]:
+                if action["action"] == "sync" and action["source"] not in sources:
+                    sources.append(action["source"])
+            if job["type"] == "remote":
+                target = {k: job.get(k) for k in ["host", "user", "port", "private_key_path"]}
+                sync_targets[json.dumps(target, sort_keys=True)] = target
+        return {
+            "targets": list(sync_targets.values()),
+            "sources": sources,
+            "sample_mb": args.sample_mb,
+            "read_mb": args.read_mb,
+            "rtt_samples": args.rtt_samples,
+        }
+
+    @staticmethod
+    def run_host(args: Namespace, spec: Dict) -> Dict:
+        conn = Utils.get_connection(args.installation_host, args.installation_user)
+        try:
+            remote_script_path = Utils.put_remote_script(conn, "preflight.py")
+            result = conn.sudo(
+                f"{args.remote_python_path} {remote_script_path} --spec {shlex.quote(json.dumps(spec))}",
+                user=args.remote_rsyncdirector_run_user,
+                warn=True,
+                hide=True,
+            )
+        finally:
+            conn.close()
+        if not result.ok:
+            raise Exception(f"running preflight script; result={result}")
+        return json.loads(result.stdout)
+
+    @staticmethod
+    def get_recommendation(ssh: Dict, read_mb_s: float | None) -> str:
+        compress = ssh["compressed_mb_s"] > ssh["uncompressed_mb_s"] * COMPRESSION_MIN_SPEEDUP
+        stream_mb_s = max(ssh["compressed_mb_s"], ssh["uncompressed_mb_s"])
+        recommendation = ["compress (-z)" if compress else "no compression"]
+
+        # A single rsync stream is usually bound by the latency and per-connection throughput of
+        # the link.  Run enough jobs in parallel to saturate the disk, but no more.
+        if read_mb_s is not None and stream_mb_s > 0:
+            parallelism = int(read_mb_s // stream_mb_s)
+            parallelism = max(1, min(MAX_RECOMMENDED_PARALLELISM, parallelism))
+            bound = "link" if parallelism > 1 else "disk"
+            recommendation.append(f"parallelism {parallelism} ({bound} bound)")
+        return ", ".join(recommendation)
@@ -4,19 +4,67 @@
 # Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
 # All rights reserved.
 
+from __future__ import annotations
+
 import argparse
+import hashlib
+import json
 import os
-import tempfile
-from contextlib import chdir
+import shlex
 from logging import Logger
-
-import requests
-from invoke import run
+from typing import TYPE_CHECKING
 
 from rsyncdirector_deploy.argparser import ArgParser
+from rsyncdirector_deploy.consts import DOWNLOAD_CONNECTIONS_DEFAULT
+from rsyncdirector_deploy.deploy.build_plan import REMOTE_TMPFS_DIR, BuildPlan
+from rsyncdirector_deploy.deploy.linux import LinuxDistro
+from rsyncdirector_deploy.deploy.remote_job import RemoteJob
 from rsyncdirector_deploy.deploy.utils import Utils
 
+if TYPE_CHECKING:
+    from fabric import Connection
+
 REMOTE_PARENT_DIR_DEFAULT = "/usr/local"
+REMOTE_TARBALL_DIR = "/var/tmp/python-src"
+# Persistent source tree and compiler cache for --incremental builds.  The source tree is always
+# unpacked to the same path so that the compiler cache entries of one version are hits for the
+# unchanged files of the next.
+REMOTE_BUILD_CACHE_DIR_DEFAULT = "/var/cache/rsyncdirector_deploy/python-build"
+CCACHE_MAX_SIZE_DEFAULT = "5G"
+
+# Named sets of configure options with which to build the interpreter, with the approximate size
+# of the build tree and memory used by each make job, from which the build is planned.
+BUILD_PROFILES = {
+    # A plain build, the quickest to compile.
+    "fast-build": {
+        "configure_opts": [],
+        "build_tree_mib": 512,
+        "job_memory_mib": 256,
+    },
+    # Profile guided and link time optimizations.  Compiling takes several times longer as the
+    # interpreter is built twice and the test suite is run in between to gather the profile.
+    "optimized": {
+        "configure_opts": ["--enable-optimizations", "--with-lto"],
+        "build_tree_mib": 1024,
+        "job_memory_mib": 1024,
+    },
+    # Optimized, without the test suite, static library and other files that are not required to
+    # run rsyncdirector.
+    "minimal": {
+        "configure_opts": [
+            "--enable-optimizations",
+            "--with-lto",
+            "--disable-test-modules",
+            "--without-static-libpython",
+        ],
+        "build_tree_mib": 768,
+        "job_memory_mib": 1024,
+    },
+}
+BUILD_PROFILE_DEFAULT = "fast-build"
+
+# Written into the root of the python installation.
+BUILD_REPORT_FILE_NAME = "rsyncdirector_deploy-build.json"
 
 
 class Python(ArgParser):
@@ -55,6 +103,117 @@ class Python(ArgParser):
             default=REMOTE_PARENT_DIR_DEFAULT,
             help="The parent directory into which the Python directory will be installed",
         )
+        Python.parser.add_argument(
+            "--build-profile",
+            "-b",
+            type=str,
+            choices=list(BUILD_PROFILES.keys()),
+            default=BUILD_PROFILE_DEFAULT,
+            help=(
+                "The set of configure options with which to build Python.  'optimized' enables "
+                "PGO and LTO, 'minimal' additionally omits the test suite and static library"
+            ),
+        )
+        Python.parser.add_argument(
+            "--skip-benchmark",
+            "-k",
+            action="store_true",
+            help=(
+                "Do not run the interpreter startup, config json decode and subprocess spawn "
+                f"micro-benchmark after the build.  Its results are written to "
+                f"{BUILD_REPORT_FILE_NAME} in the python installation directory"
+            ),
+        )
+        Python.parser.add_argument(
+            "--download-connections",
+            "-c",
+            type=int,
+            default=DOWNLOAD_CONNECTIONS_DEFAULT,
+            help=(
+                "Number of connections over which the source tarball is downloaded in parallel "
+                "ranges.  Falls back to a single connection when the server does not support "
+                "range requests"
+            ),
+        )
+        Python.parser.add_argument(
+            "--detach",
+            "-d",
+            action="store_true",
+            help=(
+                "Return as soon as the build has been started on the remote host.  The build runs "
+                "detached from the SSH session either way, running the same command again "
+                "reattaches to it and completes the installation once it has finished"
+            ),
+        )
+        Python.parser.add_argument(
+            "--incremental",
+            "-i",
+            action="store_true",
+            help=(
+                "Build in a persistent source tree with ccache, so that rebuilding for a patch "
+                "level upgrade only compiles the files that changed.  ccache is installed if "
+                "required"
+            ),
+        )
+        Python.parser.add_argument(
+            "--build-cache-dir",
+            "-a",
+            type=str,
+            default=REMOTE_BUILD_CACHE_DIR_DEFAULT,
+            help="Directory on the remote host of the persistent source tree and compiler cache",
+        )
+        Python.parser.add_argument(
+            "--ccache-max-size",
+            "-z",
+            type=str,
+            default=CCACHE_MAX_SIZE_DEFAULT,
+            help="Maximum size of the compiler cache, the least recently used entries are evicted",
+        )
+        Python.parser.add_argument(
+            "--clear-build-cache",
+            "-x",
+            action="store_true",
+            help="Delete the persistent source tree and compiler cache before an incremental build",
+        )
+        Python.parser.add_argument(
+            "--make-jobs",
+            "-j",
+            type=int,
+            default=0,
+            help=(
+                "Number of parallel make jobs.  With 0 it is planned from the cores that are not "
+                "busy and the available memory on the remote host"
+            ),
+        )
+        Python.parser.add_argument(
+            "--no-build-tmpfs",
+            "-t",
+            action="store_true",
+            help=(
+                f"Always build on disk.  Otherwise the build tree is placed on {REMOTE_TMPFS_DIR} "
+                "when it is a tmpfs with room for it and enough memory is left for the make jobs"
+            ),
+        )
+        Python.parser.add_argument(
+            "--build-priority",
+            "-p",
+            type=str,
+            choices=["auto", "normal", "low"],
+            default="auto",
+            help=(
+                "CPU and IO priority of the build.  'auto' lowers it with nice and ionice when the "
+                "remote host's load average shows that it is running a workload"
+            ),
+        )
+        Python.parser.add_argument(
+            "--keep-build-tree",
+            "-e",
+            action="store_true",
+            help=(
+                "Do not remove the source tarball and build tree after the build.  The tree of an "
+                "--incremental build is always kept"
+            ),
+        )
         Python.parser.set_defaults(func=Python.install)
 
     @staticmethod
@@ -62,55 +221,223 @@ class Python(ArgParser):
         logger.info("installing Python; args={args}")
         conn = Utils.get_connection(args.installation_host, args.installation_user)
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            filename = os.path.basename(args.source_tarball_url)
-            if not filename:
-                raise Exception("could not glean file name from URL")
-
-            source_dir = filename.replace(".tgz", "")
-            version = source_dir.replace("Python-", "")
-            file_path = os.path.join(os.sep, temp_dir, filename)
-
-            response = requests.get(args.source_tarball_url, stream=True)
-            response.raise_for_status()
-            with open(file_path, "wb") as fh:
-                for chunk in response.iter_content(chunk_size=8192):
-                    fh.write(chunk)
-
-            logger.info(f"Python tarball downloaded, file_path={file_path}")
-            with chdir(temp_dir):
-                result = run(f"md5sum {file_path}")
-                if result is None or result.return_code != 0:
-                    raise Exception(
-                        f"getting checksum for python tarball; file_path={file_path}, result={result}"
-                    )
-                md5sum = result.stdout.split()[0]
-                if args.source_tarball_md5sum != md5sum:
-                    raise Exception(
-                        f"md5sums did not match; expected={args.source_tarball_md5sum}, actual={md5sum}"
-                    )
-
-                remote_tarball_dir = os.path.join(os.sep, "var", "tmp", "python-src")
-                conn.run(f"mkdir -p {remote_tarball_dir}")
-                remote_tarball_path = os.path.join(os.sep, remote_tarball_dir, filename)
-                remote_source_path = os.path.join(os.sep, remote_tarball_dir, source_dir)
-                conn.put(file_path, remote_tarball_path)
-
-                # Delete any existing python installation if it exists.
-                remote_target_dir = os.path.join(
-                    os.sep, args.remote_parent_dir, f"python-{version}"
+        filename = os.path.basename(args.source_tarball_url)
+        if not filename:
+            raise Exception("could not glean file name from URL")
+
+        source_dir = filename.replace(".tgz", "")
+        version = source_dir.replace("Python-", "")
+        remote_tarball_path = os.path.join(REMOTE_TARBALL_DIR, filename)
+        remote_target_dir = os.path.join(os.sep, args.remote_parent_dir, f"python-{version}")
+        ccache_dir = None
+        if args.incremental:
+            ccache_dir = os.path.join(args.build_cache_dir, "ccache")
+
+        # The same build on the same host always has the same job name, so that running the same
+        # command again reattaches to it.  The plan is not part of the name as it depends on the
+        # host's load, which includes that of the running build.
+        build_digest = hashlib.sha256(
+            f"{args.build_profile}\n{remote_target_dir}\n{ccache_dir}".encode("utf-8")
+        ).hexdigest()
+        job_name = f"python-{version}-{build_digest[:12]}"
+
+        plan = None
+        job_state = RemoteJob.poll(conn, job_name)["state"]
+        if job_state in ("running", "exited"):
+            logger.info(f"reattaching to python build; job_name={job_name}, state={job_state}")
+        else:
+            profile = BUILD_PROFILES[args.build_profile]
+            plan = BuildPlan.plan(logger, args, BuildPlan.get_facts(conn), profile)
+            if args.incremental:
+                remote_source_path = os.path.join(args.build_cache_dir, "src")
+            else:
+                build_root = (
+                    os.path.join(REMOTE_TMPFS_DIR, "rsyncdirector_deploy-python-build")
+                    if plan["tmpfs"]
+                    else REMOTE_TARBALL_DIR
+                )
+                remote_source_path = os.path.join(build_root, source_dir)
+
+            Python.upload_source(conn, logger, args, filename, REMOTE_TARBALL_DIR)
+
+            # Delete any existing python installation if it exists.
+            Utils.delete_dir(
+                conn, logger, remote_target_dir, "removing and rebuilding python installation"
+            )
+
+            if args.incremental:
+                Python.prepare_incremental_build(
+                    conn, logger, args, remote_tarball_path, remote_source_path, ccache_dir
+                )
+            else:
+                conn.run(
+                    f"rm -rf {remote_source_path} && mkdir -p {build_root} && "
+                    f"tar -xzf {remote_tarball_path} -C {build_root}"
                 )
 
-                Utils.delete_dir(
-                    conn, logger, remote_target_dir, "removing and rebuilding python installation"
+            build_command = BuildPlan.wrap_command(
+                plan,
+                Python.get_build_command(
+                    args.build_profile, remote_target_dir, ccache_dir, plan["make_jobs"]
+                ),
+            )
+            if not args.incremental and not args.keep_build_tree:
+                # Removed by the job itself, so that a detached build also cleans up after itself.
+                build_command = (
+                    f"{build_command}; status=$?; "
+                    f"rm -rf {remote_source_path} {remote_tarball_path}; "
+                    "exit $status"
                 )
+            logger.info(
+                f"building python; build_profile={args.build_profile}, command={build_command}"
+            )
+            RemoteJob.start(conn, logger, job_name, build_command, remote_source_path)
+            if args.detach:
+                print(
+                    f"\npython build started on host [{args.installation_host}], run the same "
+                    "command again without --detach to follow it and complete the installation",
+                    flush=True,
+                )
+                conn.close()
+                return
+
+        build_seconds = RemoteJob.wait(
+            conn, logger, job_name, tail_existing_log=job_state != "absent"
+        )
+        logger.info(
+            f"python build complete; build_profile={args.build_profile}, "
+            f"seconds={build_seconds:.0f}"
+        )
 
-                with conn.cd(remote_tarball_dir):
-                    conn.run(f"tar -xzvf {filename}")
-                with conn.cd(remote_source_path):
-                    conn.run(
-                        f"./configure --prefix={remote_target_dir} --exec-prefix={remote_target_dir}"
-                    )
-                    conn.run("make && make install")
+        build_report = {
+            "build_profile": args.build_profile,
+            "configure_opts": BUILD_PROFILES[args.build_profile]["configure_opts"],
+            "build_seconds": build_seconds,
+        }
+        if plan is not None:
+            build_report["build_plan"] = plan
+        if not args.skip_benchmark:
+            Python.run_benchmark(conn, logger, remote_target_dir, build_report)
 
         conn.close()
+
+    @staticmethod
+    def upload_source(
+        conn: Connection,
+        logger: Logger,
+        args: argparse.Namespace,
+        filename: str,
+        remote_tarball_dir: str,
+    ) -> None:
+        from rsyncdirector_deploy.deploy.download import Download
+        from rsyncdirector_deploy.deploy.transfer import Transfer
+
+        # Downloaded into the local cache so that an interrupted download is resumed, and a
+        # complete one reused, by the next installation.
+        file_path = Download.fetch(
+            logger,
+            args.source_tarball_url,
+            os.path.join(Utils.get_local_cache_dir("downloads"), filename),
+            args.source_tarball_md5sum,
+            digest_algorithm="md5",
+            connections=args.download_connections,
+        )
+
+        remote_tarball_path = os.path.join(os.sep, remote_tarball_dir, filename)
+        Transfer.put(
+            conn,
+            logger,
+            file_path,
+            remote_tarball_path,
+            method=args.transfer_method,
+            connections=args.transfer_connections,
+        )
+
+    @staticmethod
+    def get_build_command(
+        build_profile: str,
+        remote_target_dir: str,
+        ccache_dir: str | None = None,
+        make_jobs: int = 1,
+    ) -> str:
+        profile = BUILD_PROFILES[build_profile]
+        configure_opts = [f"--prefix={remote_target_dir}", f"--exec-prefix={remote_target_dir}"]
+        configure_opts += profile["configure_opts"]
+        # Only the build is run in parallel, install is not safe to run with parallel jobs.
+        make = f"make -j {make_jobs}"
+        if ccache_dir is None:
+            return f"./configure {' '.join(configure_opts)} && {make} && make install"
+
+        configure_opts.append("CC='ccache cc'")
+        # Print the cache statistics of this build at the end of the build log.
+        return (
+            f"export CCACHE_DIR={ccache_dir} && ccache --zero-stats > /dev/null && "
+            f"./configure {' '.join(configure_opts)} && {make} && make install && "
+            "ccache --show-stats"
+        )
+
+    @staticmethod
+    def prepare_incremental_build(
+        conn: Connection,
+        logger: Logger,
+        args: argparse.Namespace,
+        remote_tarball_path: str,
+        remote_source_path: str,
+        ccache_dir: str,
+    ) -> None:
+        if not conn.run("command -v ccache", warn=True, hide=True).ok:
+            distro = LinuxDistro.get_linux_distro(conn)
+            LinuxDistro.install_packages(conn, distro, ["ccache"])
+            if not conn.run("command -v ccache", warn=True, hide=True).ok:
+                raise Exception(f"ccache is not available on the host; distro={distro}")
+
+        if args.clear_build_cache:
+            logger.info(f"clearing python build cache; path={args.build_cache_dir}")
+            conn.run(f"rm -rf {args.build_cache_dir}")
+
+        # The previous version's tree is replaced, its object files are served from the cache.
+        conn.run(f"rm -rf {remote_source_path} && mkdir -p {remote_source_path} {ccache_dir}")
+        conn.run(f"tar -xzf {remote_tarball_path} -C {remote_source_path} --strip-components=1")
+        conn.run(f"rm -f {remote_tarball_path}")
+        # Persisted in the ccache.conf in the cache dir, and enforced by ccache as it adds entries.
+        conn.run(f"CCACHE_DIR={ccache_dir} ccache --max-size={args.ccache_max_size}", hide=True)
+        logger.info(
+            f"incremental python build prepared; source_path={remote_source_path}, "
+            f"ccache_dir={ccache_dir}, max_size={args.ccache_max_size}"
+        )
+
+    @staticmethod
+    def run_benchmark(
+        conn: Connection, logger: Logger, remote_target_dir: str, build_report: dict
+    ) -> None:
+        remote_script_path = Utils.put_remote_script(conn, "python_benchmark.py")
+        report_path = os.path.join(os.sep, remote_target_dir, BUILD_REPORT_FILE_NAME)
+        result = conn.run(
+            shlex.join(
+                [
+                    f"{remote_target_dir}/bin/python3",
+                    remote_script_path,
+                    "--output",
+                    report_path,
+                    "--metadata",
+                    json.dumps(build_report),
+                ]
+            ),
+            warn=True,
+            hide=True,
+        )
+        if not result.ok:
+            # The interpreter is already installed, a failed benchmark should not fail the install.
+            logger.warning(f"running python benchmark failed; result={result}")
+            return
+
+        report = json.loads(result.stdout)
+        print(
+            f"\npython build on host [{conn.host}], profile [{report['build_profile']}], "
+            f"build time {report['build_seconds']:.0f}s\n"
+            f"  interpreter startup: {report['interpreter_startup']['median_ms']:.1f} ms\n"
+            f"  config json decode: {report['json_decode']['median_ms']:.2f} ms\n"
+            f"  subprocess spawn: {report['subprocess_spawn']['median_ms']:.1f} ms\n"
+            f"  report: {report_path}",
+            flush=True,
+        )
@@ -0,0 +1,197 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from io import StringIO
+from logging import Logger
+from typing import TYPE_CHECKING, Dict
+
+from rsyncdirector_deploy.consts import REMOTE_JOBS_DIR
+
+if TYPE_CHECKING:
+    from fabric import Connection
+
+JOB_SCRIPT_NAME = "job.sh"
+
+# Run by the detached job on the remote host.  The exit status is written last, and atomically, so
+# that its presence means that the job has finished.
+JOB_SCRIPT = r"""#!/bin/sh
+echo $$ > {job_dir}/pid
+date +%s > {job_dir}/started
+(
+  cd {cwd} && {command}
+) > {job_dir}/log 2>&1
+status=$?
+date +%s > {job_dir}/finished
+echo $status > {job_dir}/exit_status.tmp && mv {job_dir}/exit_status.tmp {job_dir}/exit_status
+"""
+
+# Prefer a transient systemd unit as it is tracked, and its output kept, by systemd.  Otherwise the
+# job is detached from the SSH session in a new session with nohup.
+START_SCRIPT = r"""
+if [ "$(id -u)" = 0 ] && [ -d /run/systemd/system ] && command -v systemd-run > /dev/null 2>&1; then
+  systemd-run --quiet --collect --unit={unit} /bin/sh {job_script}
+else
+  nohup setsid /bin/sh {job_script} > /dev/null 2>&1 < /dev/null &
+fi
+# Wait for the job to record its pid so that it is not mistaken for a lost job by the first poll.
+i=0
+while [ ! -f {job_dir}/pid ] && [ $i -lt 100 ]; do sleep 0.1; i=$((i + 1)); done
+[ -f {job_dir}/pid ]
+"""
+
+# Returns the state of the job on the first line, then the log from the given offset.  The job is
+# 'lost' if it did not write an exit status and is no longer running, e.g. the host rebooted.
+POLL_SCRIPT = r"""
+d={job_dir}
+if [ -f $d/exit_status ]; then
+  echo "exited $(cat $d/exit_status) $(cat $d/started) $(cat $d/finished)"
+elif [ -f $d/pid ] && grep -qs {job_script_name} /proc/$(cat $d/pid)/cmdline; then
+  echo "running"
+elif [ -d $d ]; then
+  echo "lost"
+else
+  echo "absent"
+fi
+[ -f $d/log ] && tail -c +{offset} $d/log | head -c {max_bytes}
+"""
+
+POLL_INTERVAL_SECONDS = 10
+POLL_MAX_BYTES = 1024 * 1024
+# Consecutive failed polls, e.g. while the network is down, before giving up.  The job keeps
+# running on the remote host and can be reattached by running the same command again.
+POLL_MAX_FAILURES = 30
+LOG_TAIL_BYTES = 4096
+
+
+class RemoteJob(object):
+    """
+    Runs long commands, like compiling Python, detached from the SSH session so that they survive
+    the session being dropped.  The output and exit status of a job are written to files in its
+    job dir on the remote host, which are polled until it finishes.  Jobs are identified by name so
+    that a later invocation can reattach to a job that is still running, or collect its result.
+    """
+
+    @staticmethod
+    def get_job_dir(name: str) -> str:
+        return os.path.join(REMOTE_JOBS_DIR, name)
+
+    @staticmethod
+    def start(conn: Connection, logger: Logger, name: str, command: str, cwd: str) -> None:
+        job_dir = RemoteJob.get_job_dir(name)
+        job_script = os.path.join(job_dir, JOB_SCRIPT_NAME)
+        result = conn.run(f"rm -rf {job_dir} && mkdir -p -m 755 {job_dir}", warn=True, hide=True)
+        if not result.ok:
+            raise Exception(f"creating remote job dir; job_dir={job_dir}, result={result}")
+        conn.put(StringIO(JOB_SCRIPT.format(job_dir=job_dir, cwd=cwd, command=command)), job_script)
+        result = conn.run(
+            START_SCRIPT.format(
+                unit=f"rsyncdirector-deploy-{name}", job_dir=job_dir, job_script=job_script
+            ),
+            warn=True,
+            hide=True,
+        )
+        if not result.ok:
+            raise Exception(f"starting remote job; name={name}, result={result}")
+        logger.info(f"remote job started; name={name}, job_dir={job_dir}")
+
+    @staticmethod
+    def poll(conn: Connection, name: str, offset: int = 0) -> Dict:
+        """
+        Returns the state of the job: 'absent', 'running', 'lost' or 'exited', with the exit_status
+        and elapsed seconds when it has exited, and the log from the byte offset.
+        """
+        job_dir = RemoteJob.get_job_dir(name)
+        result = conn.run(
+            POLL_SCRIPT.format(
+                job_dir=job_dir,
+                job_script_name=JOB_SCRIPT_NAME,
+                offset=offset + 1,
+                max_bytes=POLL_MAX_BYTES,
+            ),
+            warn=True,
+            hide=True,
+        )
+        state_line, _, log = result.stdout.partition("\n")
+        tokens = state_line.split()
+        if not tokens:
+            raise Exception(f"polling remote job; name={name}, result={result}")
+        retval = {"state": tokens[0], "log": log}
+        if tokens[0] == "exited":
+            retval["exit_status"] = int(tokens[1])
+            retval["seconds"] = int(tokens[3]) - int(tokens[2])
+        return retval
+
+    @staticmethod
+    def wait(conn: Connection, logger: Logger, name: str, tail_existing_log: bool = False) -> float:
+        """
+        Streams the log of the job to stdout until it exits, reconnecting if the SSH session is
+        dropped.  Raises an Exception if the job failed or was lost.  Returns the duration of the
+        job in seconds.  When reattaching, only the end of the log written so far is printed.
+        """
+        offset = 0
+        if tail_existing_log:
+            size = conn.run(
+                f"stat -c %s {RemoteJob.get_job_dir(name)}/log 2>/dev/null || echo 0",
+                hide=True,
+            )
+            offset = max(int(size.stdout.strip() or 0) - LOG_TAIL_BYTES, 0)
+
+        failures = 0
+        while True:
+            try:
+                status = RemoteJob.poll(conn, name, offset)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if failures >= POLL_MAX_FAILURES:
+                    raise Exception(
+                        f"lost the connection to the remote job, re-run the same command to "
+                        f"reattach; name={name}, host={conn.host}, exception={e}"
+                    )
+                logger.warning(
+                    f"polling remote job failed, retrying; name={name}, failures={failures}, "
+                    f"exception={e}"
+                )
+                # Fabric opens a new connection on the next command once the old one is closed.
+                conn.close()
+                time.sleep(POLL_INTERVAL_SECONDS)
+                continue
+
+            num_bytes = len(status["log"].encode("utf-8", errors="surrogateescape"))
+            if num_bytes:
+                sys.stdout.write(status["log"])
+                sys.stdout.flush()
+                offset += num_bytes
+            # Keep reading until the log has been drained.
+            if num_bytes >= POLL_MAX_BYTES:
+                continue
+
+            match status["state"]:
+                case "running":
+                    time.sleep(POLL_INTERVAL_SECONDS)
+                case "exited":
+                    RemoteJob.remove(conn, name)
+                    if status["exit_status"] != 0:
+                        raise Exception(
+                            f"remote job failed; name={name}, exit_status={status['exit_status']}"
+                        )
+                    logger.info(f"remote job complete; name={name}, seconds={status['seconds']}")
+                    return float(status["seconds"])
+                case _:
+                    raise Exception(
+                        f"remote job is no longer running and did not record an exit status; "
+                        f"name={name}, state={status['state']}, "
+                        f"job_dir={RemoteJob.get_job_dir(name)}"
+                    )
+
+    @staticmethod
+    def remove(conn: Connection, name: str) -> None:
+        conn.run(f"rm -rf {RemoteJob.get_job_dir(name)}", warn=True, hide=True)
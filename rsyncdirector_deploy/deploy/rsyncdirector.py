@@ -8,9 +8,13 @@ import sys
 from argparse import ArgumentParser, Namespace, ArgumentDefaultsHelpFormatter
 from logging import Logger
 from rsyncdirector_deploy.argparser import ArgParser
+from rsyncdirector_deploy.deploy.audit import Audit
 from rsyncdirector_deploy.deploy.configs import Configs
 from rsyncdirector_deploy.deploy.install import Install
+from rsyncdirector_deploy.deploy.preflight import Preflight
+from rsyncdirector_deploy.deploy.service import Service
 from rsyncdirector_deploy.deploy.ssh import Ssh
+from rsyncdirector_deploy.deploy.stats import Stats
 from rsyncdirector_deploy.consts import REMOTE_RSYNC_DIRECTOR_RUN_USER, REMOTE_VIRT_ENV_DIR
 
 
@@ -41,8 +45,11 @@ class RsyncDirector(ArgParser):
             "--remote-python-path",
             "-p",
             type=str,
-            required=True,
-            help="Path on the remote host to the Python binary with which we will create the virtual environment",
+            default=None,
+            help=(
+                "Path on the remote host to the Python binary with which we will create the virtual "
+                "environment.  Required, either on the command line or in the inventory"
+            ),
         )
         parent_args.append(remote_python_path)
 
@@ -56,6 +63,16 @@ class RsyncDirector(ArgParser):
         )
         parent_args.append(remote_virt_env_parent_path)
 
+        # Subcommands that run on many hosts concurrently.
+        parallelism_arg = ArgumentParser(add_help=False)
+        parallelism_arg.add_argument(
+            "--parallelism",
+            "-j",
+            type=int,
+            default=32,
+            help="Maximum number of hosts on which to run concurrently",
+        )
+
         # RsyncDirector doesn't have any actual run targets so we DO NOT add any parents arguments.
         RsyncDirector.parser = subparsers.add_parser(
             "rsyncdirector",
@@ -75,6 +92,16 @@ class RsyncDirector(ArgParser):
         ssh_parent_args.append(remote_rsyncdirector_run_user_arg)
         Ssh.add_args(subparser, ssh_parent_args)
 
+        fleet_parent_args = parents.copy()
+        fleet_parent_args.extend(
+            [remote_rsyncdirector_run_user_arg, remote_virt_env_parent_path, parallelism_arg]
+        )
+        # The instances of sharded configs are planned from estimates made with the remote Python.
+        Audit.add_args(subparser, fleet_parent_args + [remote_python_path])
+        Preflight.add_args(subparser, fleet_parent_args + [remote_python_path])
+        Stats.add_args(subparser, fleet_parent_args)
+        Service.add_args(subparser, fleet_parent_args)
+
     @staticmethod
     def help(_args: Namespace, _logger: Logger) -> None:
         print(
@@ -0,0 +1,225 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+from typing import Any, Dict, List
+
+from rsyncdirector_deploy.deploy.utils import Utils
+
+# The schema of the rsyncdirector config file, mirroring the keys that rsyncdirector reads.  Each
+# entry can define: 'type', 'required', 'required_if' (key, value) of a sibling, 'choices',
+# 'min_length' for lists, 'keys' for the entries of a dict and 'items' for the entries of a list.
+# Keys that are not in the schema are ignored so that newer rsyncdirector configs still deploy.
+REMOTE_CONNECTION_KEYS = {
+    "host": {"type": str, "required_if": ("type", "remote")},
+    "user": {"type": str, "required_if": ("type", "remote")},
+    "port": {"type": (int, str)},
+    "private_key_path": {"type": str},
+}
+
+SCHEMA = {
+    "type": dict,
+    "keys": {
+        "rsync_id": {"type": str, "required": True},
+        "cron_schedule": {"type": str, "required": True, "cron": True},
+        "pid_file_dir": {"type": str},
+        "metrics": {
+            "type": dict,
+            "keys": {
+                "addr": {"type": str},
+                "port": {"type": int},
+                "startup_timeout_seconds": {"type": (int, float)},
+                "startup_retry_wait_seconds": {"type": (int, float)},
+                "startup_retry_limit": {"type": int},
+            },
+        },
+        "jobs": {
+            "type": list,
+            "required": True,
+            "min_length": 1,
+            "items": {
+                "type": dict,
+                "keys": {
+                    "id": {"type": str, "required": True},
+                    "type": {"type": str, "required": True, "choices": ["local", "remote"]},
+                    **REMOTE_CONNECTION_KEYS,
+                    "blocks_on": {
+                        "type": list,
+                        "items": {
+                            "type": dict,
+                            "keys": {
+                                "type": {
+                                    "type": str,
+                                    "required": True,
+                                    "choices": ["local", "remote"],
+                                },
+                                "path": {"type": str, "required": True},
+                                "wait_time": {"type": (int, float), "required": True},
+                                "timeout": {"type": (int, float)},
+                                **REMOTE_CONNECTION_KEYS,
+                            },
+                        },
+                    },
+                    "lock_files": {
+                        "type": list,
+                        "items": {
+                            "type": dict,
+                            "keys": {
+                                "type": {
+                                    "type": str,
+                                    "required": True,
+                                    "choices": ["local", "remote"],
+                                },
+                                "path": {"type": str, "required": True},
+                                **REMOTE_CONNECTION_KEYS,
+                            },
+                        },
+                    },
+                    "actions": {
+                        "type": list,
+                        "required": True,
+                        "min_length": 1,
+                        "items": {
+                            "type": dict,
+                            "keys": {
+                                "id": {"type": str, "required": True},
+                                "action": {
+                                    "type": str,
+                                    "required": True,
+                                    "choices": ["sync", "command"],
+                                },
+                                "source": {"type": str, "required_if": ("action", "sync")},
+                                "dest": {"type": str, "required_if": ("action", "sync")},
+                                "opts": {
+                                    "type": list,
+                                    "required_if": ("action", "sync"),
+                                    "items": {"type": str},
+                                },
+                                "command": {"type": str, "required_if": ("action", "command")},
+                                "args": {"type": list, "items": {"type": str}},
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+# Bump whenever the SCHEMA changes so that previously validated configs are validated again.
+SCHEMA_VERSION = 1
+
+
+class RsyncDirectorConfig(object):
+
+    # Parsed and validated configs keyed by the sha256 of the contents of the config file.
+    cache: Dict[str, Dict] = {}
+
+    @staticmethod
+    def load(path: str) -> Dict:
+        """
+        Parses and validates an rsyncdirector config file, raising an Exception listing every
+        validation error.  Results are cached by the hash of the file contents, in memory and on the
+        local host, so a config that has already been validated is not parsed again.  A deep copy is
+        returned so that callers can modify it without modifying the cached config.
+        """
+        with open(path, "rb") as fh:
+            data = fh.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        if digest not in RsyncDirectorConfig.cache:
+            RsyncDirectorConfig.cache[digest] = RsyncDirectorConfig.load_and_validate(
+                path, data, digest
+            )
+        return copy.deepcopy(RsyncDirectorConfig.cache[digest])
+
+    @staticmethod
+    def load_and_validate(path: str, data: bytes, digest: str) -> Dict:
+        cache_path = os.path.join(
+            Utils.get_local_cache_dir("configs"), f"{digest}-v{SCHEMA_VERSION}.json"
+        )
+        try:
+            with open(cache_path, "r") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            pass
+
+        config = Utils.load_yaml_string(data)
+        errors = RsyncDirectorConfig.validate(config)
+        if errors:
+            raise Exception(
+                f"invalid rsyncdirector config; path={path}, errors=\n  " + "\n  ".join(errors)
+            )
+
+        # Only cache configs that survive a round trip through json unchanged, anything else is
+        # simply validated again on the next run.
+        try:
+            serialized = json.dumps(config)
+        except TypeError:
+            return config
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fh:
+            fh.write(serialized)
+        os.replace(tmp_path, cache_path)
+        return config
+
+    @staticmethod
+    def validate(config: Any) -> List[str]:
+        errors = []
+        RsyncDirectorConfig.validate_value(config, SCHEMA, "", errors)
+        if not errors:
+            job_ids = [job["id"] for job in config["jobs"]]
+            duplicates = sorted({i for i in job_ids if job_ids.count(i) > 1})
+            if duplicates:
+                errors.append(f"jobs: duplicate job ids; ids={duplicates}")
+        return errors
+
+    @staticmethod
+    def validate_value(value: Any, schema: Dict, path: str, errors: List[str]) -> None:
+        expected_type = schema["type"]
+        # bool is a subclass of int, but is never a valid value where an int is expected.
+        if not isinstance(value, expected_type) or (
+            isinstance(value, bool) and expected_type is not bool
+        ):
+            errors.append(
+                f"{path or '<root>'}: expected {RsyncDirectorConfig.type_name(expected_type)}, "
+                f"got {type(value).__name__}"
+            )
+            return
+
+        if "choices" in schema and value not in schema["choices"]:
+            errors.append(f"{path}: invalid value {value!r}; choices={schema['choices']}")
+        if schema.get("cron") and len(value.split()) != 5:
+            errors.append(f"{path}: expected a crontab expression with 5 fields, got {value!r}")
+        if "min_length" in schema and len(value) < schema["min_length"]:
+            errors.append(f"{path}: expected at least {schema['min_length']} entries")
+
+        if "items" in schema:
+            for i, item in enumerate(value):
+                RsyncDirectorConfig.validate_value(item, schema["items"], f"{path}[{i}]", errors)
+
+        for key, key_schema in schema.get("keys", {}).items():
+            key_path = f"{path}.{key}" if path else key
+            required = key_schema.get("required", False)
+            if "required_if" in key_schema:
+                sibling, sibling_value = key_schema["required_if"]
+                required = value.get(sibling) == sibling_value
+            if key not in value:
+                if required:
+                    errors.append(f"{key_path}: required")
+                continue
+            RsyncDirectorConfig.validate_value(value[key], key_schema, key_path, errors)
+
+    @staticmethod
+    def type_name(expected_type: type | tuple) -> str:
+        if isinstance(expected_type, tuple):
+            return " or ".join(t.__name__ for t in expected_type)
+        return expected_type.__name__
@@ -0,0 +1,148 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import hashlib
+import re
+from argparse import Namespace
+from logging import Logger
+from typing import Dict, List, Set
+
+from rsyncdirector_deploy.deploy.utils import Utils
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class Schedule(object):
+    """
+    Spreads the start times of the rsyncdirector instances deployed from the same config across the
+    fleet, so that they do not all start syncing to the same target at once.  Each instance's
+    cron_schedule is shifted by an offset derived from the hash of its host and instance id, so the
+    same host and instance always get the same schedule.
+    """
+
+    @staticmethod
+    def get_offset(host: str, instance_id: str, window_minutes: int) -> int:
+        digest = hashlib.sha256(f"{host}/{instance_id}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % window_minutes
+
+    @staticmethod
+    def apply_jitter(logger: Logger, args: Namespace, instances: List[Dict]) -> List[Dict]:
+        """
+        Rewrites the cron_schedule of the config of each instance, in place, and returns the
+        schedule of each instance: the original and jittered schedule and the offset in minutes.
+        Schedules that cannot be shifted and still be expressed as a single crontab expression are
+        left unchanged.
+        """
+        # Also checked here as values from the inventory do not go through the argument's type.
+        if not isinstance(args.schedule_jitter_window, int) or args.schedule_jitter_window <= 0:
+            raise Exception(
+                "schedule jitter window must be an integer greater than 0; "
+                f"host={args.installation_host}, schedule_jitter_window={args.schedule_jitter_window}"
+            )
+        schedules = []
+        for instance in instances:
+            config = Utils.load_yaml_string(instance["config_data"])
+            original = config["cron_schedule"]
+            offset = Schedule.get_offset(
+                args.installation_host, instance["id"], args.schedule_jitter_window
+            )
+            shifted = Schedule.shift(original, offset)
+            if shifted is None:
+                logger.warning(
+                    f"unable to jitter cron_schedule, leaving it unchanged; "
+                    f"host={args.installation_host}, instance={instance['id']}, "
+                    f"cron_schedule={original}"
+                )
+                shifted = original
+            elif shifted != original:
+                config["cron_schedule"] = shifted
+                instance["config_data"] = Utils.dump_yaml(config)
+            schedules.append(
+                {
+                    "host": args.installation_host,
+                    "instance": instance["id"],
+                    "original": original,
+                    "cron_schedule": shifted,
+                    "offset_minutes": offset,
+                }
+            )
+        return schedules
+
+    @staticmethod
+    def shift(cron_schedule: str, offset: int) -> str | None:
+        """
+        Returns the crontab expression delayed by offset minutes, or None if the result cannot be
+        expressed as a single crontab expression, ie: a shift past midnight of a schedule that only
+        runs on some days.
+        """
+        fields = cron_schedule.split()
+        if len(fields) != 5:
+            return None
+        minute, hour, day_of_month, month, day_of_week = fields
+        if offset == 0:
+            return cron_schedule
+
+        # Runs every N minutes of every hour of every day, shifting its phase within the interval is
+        # equivalent.  With any other field restricted, ie: only during hour 2, the runs are shifted
+        # by the whole offset below.
+        step = re.fullmatch(r"\*/(\d+)", minute)
+        if step is not None and hour == day_of_month == month == day_of_week == "*":
+            interval = int(step.group(1))
+            if interval == 0 or 60 % interval != 0:
+                return None
+            phase = offset % interval
+            minute = f"{phase}-59/{interval}" if phase else minute
+            return " ".join([minute, hour, day_of_month, month, day_of_week])
+
+        minutes = Schedule.parse_field(minute, 0, 59)
+        hours = Schedule.parse_field(hour, 0, 23)
+        if minutes is None or hours is None:
+            return None
+
+        every_day = day_of_month == "*" and month == "*" and day_of_week == "*"
+        shifted = set()
+        for h in hours:
+            for m in minutes:
+                t = h * 60 + m + offset
+                if t >= MINUTES_PER_DAY and not every_day:
+                    return None
+                t %= MINUTES_PER_DAY
+                shifted.add((t // 60, t % 60))
+
+        # The shifted times must still be every combination of a set of hours and minutes.
+        new_hours = sorted({h for h, _ in shifted})
+        new_minutes = sorted({m for _, m in shifted})
+        if len(shifted) != len(new_hours) * len(new_minutes):
+            return None
+        hour = "*" if len(new_hours) == 24 else ",".join(str(h) for h in new_hours)
+        minute = ",".join(str(m) for m in new_minutes)
+        return " ".join([minute, hour, day_of_month, month, day_of_week])
+
+    @staticmethod
+    def parse_field(field: str, low: int, high: int) -> Set[int] | None:
+        """
+        Returns the values matched by a crontab field of numbers, ranges and steps, or None if it
+        uses any other syntax.
+        """
+        values = set()
+        for part in field.split(","):
+            match = re.fullmatch(r"(\*|(\d+)(?:-(\d+))?)(?:/(\d+))?", part)
+            if match is None:
+                return None
+            if match.group(1) == "*":
+                start, end = low, high
+            else:
+                start = int(match.group(2))
+                end = int(match.group(3)) if match.group(3) is not None else start
+                if match.group(4) is not None and match.group(3) is None:
+                    end = high
+            step = int(match.group(4)) if match.group(4) is not None else 1
+            if start < low or end > high or start > end or step < 1:
+                return None
+            values.update(range(start, end + 1, step))
+        return values
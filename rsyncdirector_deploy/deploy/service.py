@@ -0,0 +1,185 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import re
+import sys
+from argparse import ArgumentDefaultsHelpFormatter, Namespace
+from logging import Logger
+from typing import Dict, List
+
+from rsyncdirector_deploy.argparser import ArgParser
+from rsyncdirector_deploy.consts import REMOTE_CONFIG_DIR
+from rsyncdirector_deploy.deploy.stats import Stats
+from rsyncdirector_deploy.deploy.utils import Utils
+
+SERVICE_ACTIONS = ["start", "stop", "restart", "enable", "status"]
+
+SHOW_PROPERTIES = ["Id", "ActiveState", "SubState", "UnitFileState", "NRestarts"]
+
+# Instance identifiers, or shell patterns matching them, that are safe to pass to the remote shell.
+INSTANCE_PATTERN_RE = re.compile(r"[A-Za-z0-9_.\-*?\[\]]+")
+
+# Selects the deployed instances, from their env files, that match the patterns, runs a single
+# systemctl for all of them and returns the state of each.
+SERVICE_SCRIPT = r"""
+units=""
+for f in {config_dir}/rsyncdirector-*.env; do
+  [ -e "$f" ] || continue
+  i=${{f##*/rsyncdirector-}}
+  i=${{i%.env}}
+  case "$i" in
+    {patterns}) units="$units rsyncdirector@$i.service" ;;
+  esac
+done
+if [ -z "$units" ]; then
+  echo "@@result 0"
+  exit 0
+fi
+{systemctl}
+echo "@@result $rc"
+[ -n "$out" ] && printf '%s\n' "$out" | sed 's/^/@@message /'
+systemctl show $units --property={properties}
+"""
+
+
+class Service(ArgParser):
+
+    parser = None
+
+    def __init__(self):
+        super().__init__()
+
+    @staticmethod
+    def add_args(subparsers, parents=[]):
+        Service.parser = subparsers.add_parser(
+            "service",
+            help=(
+                "Start, stop, restart, enable or report the status of the rsyncdirector service "
+                "instances on many hosts concurrently, with one systemctl call per host"
+            ),
+            parents=parents,
+            formatter_class=ArgumentDefaultsHelpFormatter,
+        )
+        Service.parser.add_argument(
+            "action",
+            type=str,
+            choices=SERVICE_ACTIONS,
+            help="The systemctl action to run on the selected instances",
+        )
+        Service.parser.add_argument(
+            "--instance",
+            "-i",
+            type=str,
+            nargs="+",
+            default=["*"],
+            help=(
+                "Service instance identifiers, or shell patterns, ie: 'nightly-*' for all of the "
+                "shards of an instance, selecting the instances deployed on each host by 'configs'.  "
+                "Defaults to all of them"
+            ),
+        )
+        Service.parser.add_argument(
+            "--now",
+            action="store_true",
+            help="With 'enable', also start the instances",
+        )
+        Service.parser.add_argument(
+            "--no-block",
+            action="store_true",
+            help="Do not wait for the start, stop or restart jobs to complete",
+        )
+        Service.parser.set_defaults(func=Service.service, fleet=True)
+
+    @staticmethod
+    def service(targets: List[Namespace], logger: Logger) -> None:
+        logger.info(f"Service.service; action={targets[0].action}, num_hosts={len(targets)}")
+        results = Utils.run_concurrently(targets, Service.run_host, targets[0].parallelism)
+
+        reports = []
+        for args, report, e in results:
+            if e is not None:
+                logger.error(
+                    f"running service action failed; host={args.installation_host}, exception={e}"
+                )
+                reports.append(
+                    {"host": args.installation_host, "ok": False, "messages": [str(e)], "units": {}}
+                )
+                continue
+            reports.append(report)
+
+        Service.print_report(reports)
+        failed = [r["host"] for r in reports if not r["ok"]]
+        if failed:
+            print(f"\n{len(failed)} of {len(reports)} hosts failed: {' '.join(failed)}")
+            sys.exit(1)
+
+    @staticmethod
+    def run_host(args: Namespace) -> Dict:
+        for pattern in args.instance:
+            if INSTANCE_PATTERN_RE.fullmatch(pattern) is None:
+                raise Exception(f"invalid service instance identifier or pattern; value={pattern}")
+
+        if args.action == "status":
+            systemctl = "rc=0; out="
+        else:
+            opts = []
+            if args.now and args.action == "enable":
+                opts.append("--now")
+            if args.no_block:
+                opts.append("--no-block")
+            systemctl = f'out=$(systemctl {args.action} {" ".join(opts)} $units 2>&1); rc=$?'
+
+        conn = Utils.get_connection(args.installation_host, args.installation_user)
+        try:
+            result = conn.run(
+                SERVICE_SCRIPT.format(
+                    config_dir=REMOTE_CONFIG_DIR,
+                    patterns="|".join(args.instance),
+                    systemctl=systemctl,
+                    properties=",".join(SHOW_PROPERTIES),
+                ),
+                warn=True,
+                hide=True,
+            )
+        finally:
+            conn.close()
+        if not result.ok:
+            raise Exception(f"running service script; result={result}")
+
+        rc = None
+        messages = []
+        unit_lines = []
+        for line in result.stdout.splitlines():
+            if line.startswith("@@result "):
+                rc = int(line.split()[1])
+            elif line.startswith("@@message "):
+                messages.append(line[len("@@message ") :])
+            else:
+                unit_lines.append(line)
+        return {
+            "host": args.installation_host,
+            "ok": rc == 0,
+            "messages": messages,
+            "units": Stats.parse_units(unit_lines),
+        }
+
+    @staticmethod
+    def print_report(reports: List[Dict]) -> None:
+        print(f"\n{'HOST':<32} {'INSTANCE':<24} {'STATE':<20} {'ENABLED':<10} {'RESTARTS':>8}")
+        for report in reports:
+            for name, unit in sorted(report["units"].items()):
+                instance = name.removeprefix("rsyncdirector@").removesuffix(".service")
+                state = f"{unit.get('ActiveState')}/{unit.get('SubState')}"
+                print(
+                    f"{report['host']:<32} {instance:<24} {state:<20} "
+                    f"{unit.get('UnitFileState', ''):<10} {unit.get('NRestarts', ''):>8}"
+                )
+            if not report["units"] and report["ok"]:
+                print(f"{report['host']:<32} no matching instances")
+            for message in report["messages"]:
+                print(f"{report['host']:<32} {'error' if not report['ok'] else 'note'}: {message}")
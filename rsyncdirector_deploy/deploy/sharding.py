@@ -0,0 +1,122 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import copy
+import json
+import shlex
+from argparse import Namespace
+from logging import Logger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List
+
+from rsyncdirector_deploy.deploy.utils import Utils
+
+if TYPE_CHECKING:
+    from fabric import Connection
+
+# rsync spends time on every file, stat-ing and comparing it, regardless of its size.  Each file is
+# weighted as this many bytes when balancing jobs between the shards.
+PER_FILE_COST_BYTES = 64 * 1024
+
+
+class Sharding(object):
+
+    @staticmethod
+    def get_instances(
+        logger: Logger, args: Namespace, rsyncdirector_config: Dict, estimates: Dict
+    ) -> List[Dict]:
+        """
+        Splits the jobs in the rsyncdirector config between a number of service instances, balanced
+        by the estimated size and number of files of the sources of each job on the installation
+        host.  Returns the instances, each with its own rsync_id so that their pid files do not
+        collide.
+        """
+        num_jobs = len(rsyncdirector_config["jobs"])
+        num_shards = Sharding.get_num_shards(args.shards, estimates, num_jobs)
+
+        weights = {
+            job_id: job["bytes"] + job["files"] * PER_FILE_COST_BYTES
+            for job_id, job in estimates["jobs"].items()
+        }
+        shards = Sharding.assign(rsyncdirector_config["jobs"], weights, num_shards)
+
+        config_path = Path(args.local_rsyncdirector_config_file_path)
+        instances = []
+        for k, (load, jobs) in enumerate(shards):
+            shard_config = copy.deepcopy(rsyncdirector_config)
+            shard_config["rsync_id"] = f"{rsyncdirector_config['rsync_id']}-{k}"
+            shard_config["jobs"] = jobs
+            instance_id = f"{args.service_instance_identifier}-{k}"
+            logger.info(
+                f"config shard; instance={instance_id}, jobs={[job['id'] for job in jobs]}, "
+                f"weight_bytes={load}"
+            )
+            instances.append(
+                {
+                    "id": instance_id,
+                    "config_file_name": f"{config_path.stem}-{k}{config_path.suffix}",
+                    "config_data": Utils.dump_yaml(shard_config),
+                }
+            )
+        return instances
+
+    @staticmethod
+    def estimate(conn: Connection, args: Namespace, rsyncdirector_config: Dict) -> Dict:
+        """
+        Estimates the size and number of files of the sources of every job in a single pass on the
+        installation host.
+        """
+        spec = {
+            "jobs": {
+                job["id"]: [
+                    action["source"] for action in job["actions"] if action["action"] == "sync"
+                ]
+                for job in rsyncdirector_config["jobs"]
+            }
+        }
+        remote_script_path = Utils.put_remote_script(conn, "estimate.py")
+        result = conn.run(
+            f"{args.remote_python_path} {remote_script_path} --spec {shlex.quote(json.dumps(spec))}",
+            warn=True,
+            hide=True,
+        )
+        if not result.ok:
+            raise Exception(f"estimating rsyncdirector job sources; result={result}")
+        return json.loads(result.stdout)
+
+    @staticmethod
+    def get_num_shards(shards: str, estimates: Dict, num_jobs: int) -> int:
+        if shards == "auto":
+            # More instances than cores or disks only adds contention.
+            devices = {d for job in estimates["jobs"].values() for d in job["devices"]}
+            num_shards = min(estimates["cpu_count"], max(len(devices), 1), num_jobs)
+        else:
+            try:
+                num_shards = int(shards)
+            except ValueError:
+                raise Exception(f"invalid number of shards; shards={shards}")
+            if num_shards < 1:
+                raise Exception(f"number of shards must be at least 1; shards={shards}")
+        return max(1, min(num_shards, num_jobs))
+
+    @staticmethod
+    def assign(jobs: List[Dict], weights: Dict[str, int], num_shards: int) -> List[List]:
+        """
+        Assigns the jobs to the shards with the longest processing time first heuristic: the
+        heaviest remaining job goes to the least loaded shard.  Returns [load, jobs] per shard, with
+        the jobs of each shard in the order they appear in the config.
+        """
+        order = {job["id"]: i for i, job in enumerate(jobs)}
+        shards = [[0, []] for _ in range(num_shards)]
+        for job in sorted(jobs, key=lambda job: (-weights.get(job["id"], 0), order[job["id"]])):
+            shard = min(shards, key=lambda shard: shard[0])
+            shard[0] += weights.get(job["id"], 0)
+            shard[1].append(job)
+        for shard in shards:
+            shard[1].sort(key=lambda job: order[job["id"]])
+        return shards
@@ -4,15 +4,20 @@
 # Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
 # All rights reserved.
 
+from __future__ import annotations
+
 import os
 import sys
 from argparse import ArgumentParser, Namespace, ArgumentDefaultsHelpFormatter
-from fabric import Connection
 from logging import Logger
 from pathlib import Path
 from rsyncdirector_deploy.argparser import ArgParser
+from rsyncdirector_deploy.deploy.agent import Agent, RemoteOps
 from rsyncdirector_deploy.deploy.utils import Utils
-from typing import Tuple
+from typing import TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    from fabric import Connection
 
 
 class Ssh(ArgParser):
@@ -83,6 +88,7 @@ class Ssh(ArgParser):
     def add_known_host_keys(args: Namespace, logger: Logger) -> None:
         logger.info("Ssh.add_known_host_keys")
         conn = Utils.get_connection(args.installation_host, args.installation_user)
+        Agent.start(conn, logger, args)
         user = args.remote_rsyncdirector_run_user
         host = args.installation_host
 
@@ -102,8 +108,8 @@ class Ssh(ArgParser):
             keys = keys.split("\n")
             home = Ssh.get_home(conn, host, user)
             known_hosts_path = os.path.join(os.path.sep, home, ".ssh", "known_hosts")
-            for key in keys:
-                conn.sudo(f'echo "{key}" >> {known_hosts_path}', user=user)
+            known_hosts = "".join(f"{key}\n" for key in keys if key)
+            RemoteOps.append_file(conn, known_hosts_path, known_hosts, user)
 
         confirmation = (
             input(
@@ -119,22 +125,21 @@ class Ssh(ArgParser):
             sys.exit(0)
 
         for host in args.hosts:
-            conn.sudo(f"ssh-keygen -R {host}", user=user)
+            RemoteOps.run(conn, ["ssh-keygen", "-R", host], user=user)
             if len(args.type) == 1 and args.type[0] == "all":
                 add_key(conn, host, args.port, "all")
                 continue
             for t in args.type:
                 add_key(conn, host, args.port, t)
+        Agent.stop(conn)
 
     @staticmethod
     def get_home(conn: Connection, host: str, user: str) -> str:
-        result = conn.run(f"getent passwd {user}", warn=True, hide=True)
-        if not result.ok:
-            raise Exception(f"getent passwd {user}; result={result}")
-        stdout = result.stdout.strip()
-        stdout_tokens = stdout.split(":")
+        stdout_tokens = RemoteOps.getent(conn, "passwd", user)
+        if stdout_tokens is None:
+            raise Exception(f"getent passwd {user}; no entry found")
         if len(stdout_tokens) < 6:
             raise Exception(
-                f"invalid value returned attmpting to parse result of getent; stdout={stdout}, stdout_tokens={stdout_tokens}"
+                f"invalid value returned attmpting to parse result of getent; stdout_tokens={stdout_tokens}"
             )
         return stdout_tokens[5]
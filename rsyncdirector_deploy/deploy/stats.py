@@ -0,0 +1,292 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import sys
+import time
+from argparse import ArgumentDefaultsHelpFormatter, Namespace
+from logging import Logger
+from typing import Dict, List
+
+from rsyncdirector_deploy.argparser import ArgParser
+from rsyncdirector_deploy.deploy.utils import Utils
+
+# The accounting counters enabled in the rsyncdirector@.service unit.
+PROPERTIES = [
+    "Id",
+    "InvocationID",
+    "ActiveState",
+    "SubState",
+    "NRestarts",
+    "ActiveEnterTimestampMonotonic",
+    "CPUUsageNSec",
+    "MemoryCurrent",
+    "MemoryPeak",
+    "TasksCurrent",
+    "IOReadBytes",
+    "IOWriteBytes",
+    "IPIngressBytes",
+    "IPEgressBytes",
+]
+
+# Counters that only increase for the life of an invocation of a unit, rates are computed from the
+# difference between two samples of the same invocation.
+CUMULATIVE_COUNTERS = [
+    "CPUUsageNSec",
+    "IOReadBytes",
+    "IOWriteBytes",
+    "IPIngressBytes",
+    "IPEgressBytes",
+]
+
+# systemd reports counters that are not available, ie: accounting is disabled, as UINT64_MAX.
+UNSET = 2**64 - 1
+
+# Samples CLOCK_MONOTONIC, the time base of ActiveEnterTimestampMonotonic, and the counters of
+# every instance in a single exec.  /proc/uptime is CLOCK_BOOTTIME, which also counts the time that
+# the host was suspended.  Hosts without python3 fall back to the 'now at' of /proc/timer_list,
+# the monotonic clock in nanoseconds, which is only readable by root.
+STATS_SCRIPT = (
+    "{{ python3 -c 'import time; print(time.monotonic())' 2> /dev/null || "
+    "awk '/^now at/ {{printf \"%.6f\\n\", $3 / 1e9; exit}}' /proc/timer_list; }} && "
+    "systemctl show 'rsyncdirector@*.service' --property={properties}"
+)
+
+
+class Stats(ArgParser):
+
+    parser = None
+
+    def __init__(self):
+        super().__init__()
+
+    @staticmethod
+    def add_args(subparsers, parents=[]):
+        Stats.parser = subparsers.add_parser(
+            "stats",
+            help=(
+                "Report the CPU, memory, IO and network used by each rsyncdirector service instance "
+                "on many hosts concurrently, from the systemd accounting counters"
+            ),
+            parents=parents,
+            formatter_class=ArgumentDefaultsHelpFormatter,
+        )
+        Stats.parser.add_argument(
+            "--interval",
+            "-t",
+            type=float,
+            default=0,
+            help=(
+                "Seconds between two samples from which the rates are computed.  With 0, the rates "
+                "are computed from the sample taken by the previous run of stats"
+            ),
+        )
+        Stats.parser.add_argument(
+            "--format",
+            "-f",
+            type=str,
+            choices=["table", "json", "csv"],
+            default="table",
+            help="Output format of the report",
+        )
+        Stats.parser.set_defaults(func=Stats.stats, fleet=True)
+
+    @staticmethod
+    def stats(targets: List[Namespace], logger: Logger) -> None:
+        logger.info(f"Stats.stats; num_hosts={len(targets)}")
+        results = Utils.run_concurrently(targets, Stats.get_host_stats, targets[0].parallelism)
+
+        rows = []
+        for args, host_rows, e in results:
+            if e is not None:
+                logger.error(f"getting stats failed; host={args.installation_host}, exception={e}")
+                rows.append({"host": args.installation_host, "error": str(e)})
+                continue
+            rows.extend(host_rows)
+
+        match targets[0].format:
+            case "json":
+                print(json.dumps(rows, indent=2))
+            case "csv":
+                fieldnames = [k for k in Stats.get_row_template() if k != "error"] + ["error"]
+                writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(rows)
+            case _:
+                Stats.print_table(rows)
+
+    @staticmethod
+    def get_host_stats(args: Namespace) -> List[Dict]:
+        cache_path = os.path.join(
+            Utils.get_local_cache_dir("stats"), f"{args.installation_host}.json"
+        )
+        conn = Utils.get_connection(args.installation_host, args.installation_user)
+        try:
+            if args.interval > 0:
+                previous = Stats.sample(conn)
+                time.sleep(args.interval)
+            else:
+                try:
+                    with open(cache_path, "r") as fh:
+                        previous = json.load(fh)
+                except (OSError, ValueError):
+                    previous = None
+            current = Stats.sample(conn)
+        finally:
+            conn.close()
+
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(current, fh)
+        os.replace(tmp_path, cache_path)
+        return Stats.get_rows(args.installation_host, previous, current)
+
+    @staticmethod
+    def sample(conn) -> Dict:
+        result = conn.run(
+            STATS_SCRIPT.format(properties=",".join(PROPERTIES)), warn=True, hide=True
+        )
+        if not result.ok:
+            raise Exception(f"getting systemd accounting counters; result={result}")
+        lines = result.stdout.splitlines()
+        return {"monotonic": float(lines[0]), "units": Stats.parse_units(lines[1:])}
+
+    @staticmethod
+    def parse_units(lines: List[str]) -> Dict[str, Dict]:
+        """
+        Parses the output of systemctl show for many units, blocks of key=value lines separated by
+        empty lines, into the properties of each unit keyed by the unit name.
+        """
+        units = {}
+        unit = {}
+        for line in lines + [""]:
+            if not line.strip():
+                if "Id" in unit:
+                    units[unit["Id"]] = unit
+                unit = {}
+                continue
+            key, _, value = line.partition("=")
+            unit[key] = value
+        return units
+
+    @staticmethod
+    def get_counter(unit: Dict, key: str) -> int | None:
+        value = unit.get(key, "")
+        if not value.isdigit() or int(value) == UNSET:
+            return None
+        return int(value)
+
+    @staticmethod
+    def get_row_template() -> Dict:
+        return {
+            "host": None,
+            "instance": None,
+            "state": None,
+            "restarts": None,
+            "uptime_s": None,
+            "cpu_s": None,
+            "cpu_pct": None,
+            "memory_bytes": None,
+            "memory_peak_bytes": None,
+            "tasks": None,
+            "io_read_bytes": None,
+            "io_write_bytes": None,
+            "io_read_bytes_s": None,
+            "io_write_bytes_s": None,
+            "net_in_bytes": None,
+            "net_out_bytes": None,
+            "net_in_bytes_s": None,
+            "net_out_bytes_s": None,
+            "error": None,
+        }
+
+    @staticmethod
+    def get_rows(host: str, previous: Dict | None, current: Dict) -> List[Dict]:
+        rows = []
+        for name, unit in sorted(current["units"].items()):
+            counters = {key: Stats.get_counter(unit, key) for key in PROPERTIES[4:]}
+            row = Stats.get_row_template()
+            row.update(
+                {
+                    "host": host,
+                    "instance": name.removeprefix("rsyncdirector@").removesuffix(".service"),
+                    "state": f"{unit.get('ActiveState')}/{unit.get('SubState')}",
+                    "restarts": counters["NRestarts"],
+                    "cpu_s": Stats.scale(counters["CPUUsageNSec"], 1e-9),
+                    "memory_bytes": counters["MemoryCurrent"],
+                    "memory_peak_bytes": counters["MemoryPeak"],
+                    "tasks": counters["TasksCurrent"],
+                    "io_read_bytes": counters["IOReadBytes"],
+                    "io_write_bytes": counters["IOWriteBytes"],
+                    "net_in_bytes": counters["IPIngressBytes"],
+                    "net_out_bytes": counters["IPEgressBytes"],
+                }
+            )
+            if unit.get("ActiveState") == "active" and counters["ActiveEnterTimestampMonotonic"]:
+                row["uptime_s"] = round(
+                    current["monotonic"] - counters["ActiveEnterTimestampMonotonic"] / 1e6
+                )
+
+            # Counters are reset when the unit is restarted, only compare samples of the same
+            # invocation.
+            before = (previous or {}).get("units", {}).get(name)
+            elapsed = current["monotonic"] - (previous or {}).get("monotonic", current["monotonic"])
+            if before and before.get("InvocationID") == unit.get("InvocationID") and elapsed > 0:
+                deltas = {}
+                for key in CUMULATIVE_COUNTERS:
+                    start = Stats.get_counter(before, key)
+                    deltas[key] = (
+                        None
+                        if start is None or counters[key] is None
+                        else (counters[key] - start) / elapsed
+                    )
+                row["cpu_pct"] = Stats.scale(deltas["CPUUsageNSec"], 1e-9 * 100)
+                row["io_read_bytes_s"] = Stats.scale(deltas["IOReadBytes"], 1)
+                row["io_write_bytes_s"] = Stats.scale(deltas["IOWriteBytes"], 1)
+                row["net_in_bytes_s"] = Stats.scale(deltas["IPIngressBytes"], 1)
+                row["net_out_bytes_s"] = Stats.scale(deltas["IPEgressBytes"], 1)
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def scale(value: float | None, factor: float) -> float | None:
+        return None if value is None else round(value * factor, 2)
+
+    @staticmethod
+    def format_bytes(value: float | None) -> str:
+        if value is None:
+            return "-"
+        for unit in ["B", "K", "M", "G", "T"]:
+            if abs(value) < 1024 or unit == "T":
+                return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+            value /= 1024
+
+    @staticmethod
+    def print_table(rows: List[Dict]) -> None:
+        print(
+            f"{'HOST':<24} {'INSTANCE':<20} {'STATE':<16} {'UPTIME':>8} {'CPU_S':>9} {'CPU%':>6} "
+            f"{'MEM':>7} {'PEAK':>7} {'READ':>7} {'WRITE':>7} {'READ/S':>7} {'WRITE/S':>7} "
+            f"{'NET_OUT':>7} {'OUT/S':>7}"
+        )
+        for row in rows:
+            if row.get("error"):
+                print(f"{row['host']:<24} error: {row['error']}")
+                continue
+            fb = Stats.format_bytes
+            print(
+                f"{row['host']:<24} {row['instance']:<20} {row['state']:<16} "
+                f"{'-' if row['uptime_s'] is None else row['uptime_s']:>8} "
+                f"{'-' if row['cpu_s'] is None else row['cpu_s']:>9} "
+                f"{'-' if row['cpu_pct'] is None else row['cpu_pct']:>6} "
+                f"{fb(row['memory_bytes']):>7} {fb(row['memory_peak_bytes']):>7} "
+                f"{fb(row['io_read_bytes']):>7} {fb(row['io_write_bytes']):>7} "
+                f"{fb(row['io_read_bytes_s']):>7} {fb(row['io_write_bytes_s']):>7} "
+                f"{fb(row['net_out_bytes']):>7} {fb(row['net_out_bytes_s']):>7}"
+            )
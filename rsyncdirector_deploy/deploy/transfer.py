@@ -0,0 +1,264 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import shlex
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from typing import TYPE_CHECKING, Dict, List
+
+from rsyncdirector_deploy.consts import TRANSFER_CONNECTIONS_DEFAULT, TRANSFER_METHOD_DEFAULT
+
+if TYPE_CHECKING:
+    from fabric import Connection
+
+# Files are uploaded in chunks of this size, each recorded on the remote host once it has been
+# written so that an interrupted upload only resends the chunks that were not.
+TRANSFER_CHUNK_SIZE = 16 * 1024 * 1024
+# Size of each read from the local file and write to the channel.
+TRANSFER_BUFFER_SIZE = 256 * 1024
+
+# Returns the digest of the remote file, only when it has the same size as the local one, and the
+# chunks of the partial upload that have already been written.  Creates the partial file.
+PROBE_SCRIPT = r"""
+mkdir -p {dir}
+if [ -f {path} ] && [ "$(stat -c %s {path})" = {size} ]; then
+  echo "digest $(sha256sum {path} | cut -d' ' -f1)"
+fi
+if [ -f {part} ] && [ -f {chunks} ]; then
+  sed 's/^/chunk /' {chunks}
+else
+  rm -f {chunks} && : > {part}
+fi
+"""
+
+# Writes stdin into the partial file at the chunk's offset and records the chunk when complete.
+# The output block size is the chunk size so that seek is in units of whole chunks.
+EXEC_CHUNK_SCRIPT = (
+    "dd of={part} obs={chunk_size} seek={index} conv=notrunc 2> /dev/null && "
+    "echo {index} >> {chunks}"
+)
+
+# The file is only moved into place once its digest has been verified.
+FINALIZE_SCRIPT = r"""
+digest=$(sha256sum {part} | cut -d' ' -f1)
+if [ "$digest" != {digest} ]; then
+  rm -f {part} {chunks}
+  echo "$digest"
+  exit 1
+fi
+chmod {mode} {part} && mv -f {part} {path} && rm -f {chunks}
+"""
+
+
+class Transfer(object):
+    """
+    Uploads files to the remote host over several SSH channels at once, which unlike a single SFTP
+    session is not limited by the window of one channel on high latency links.  Uploads are
+    skipped when the remote file already has the same digest, resumed from the chunks that were
+    written by an interrupted upload, and verified end to end before the file is moved into place.
+
+    'exec' streams each chunk into dd on the remote host, 'sftp' writes each chunk with pipelined
+    SFTP writes for hosts without dd.
+    """
+
+    @staticmethod
+    def put(
+        conn: Connection,
+        logger: Logger,
+        local_path: str,
+        remote_path: str,
+        method: str = TRANSFER_METHOD_DEFAULT,
+        connections: int = TRANSFER_CONNECTIONS_DEFAULT,
+        mode: int | None = None,
+    ) -> Dict:
+        """
+        Uploads the local file to the remote path, with the mode of the local file unless one is
+        given, and returns the statistics of the upload.
+        """
+        start = time.perf_counter()
+        size = os.path.getsize(local_path)
+        with open(local_path, "rb") as fh:
+            digest = hashlib.file_digest(fh, "sha256").hexdigest()
+        if mode is None:
+            mode = stat.S_IMODE(os.stat(local_path).st_mode)
+
+        # Named after the digest, so only the chunks of the same file are resumed.
+        part = f"{remote_path}.{digest[:16]}.part"
+        chunks = f"{part}.chunks"
+        result = conn.run(
+            PROBE_SCRIPT.format(
+                dir=shlex.quote(os.path.dirname(remote_path) or "."),
+                path=shlex.quote(remote_path),
+                size=size,
+                part=shlex.quote(part),
+                chunks=shlex.quote(chunks),
+            ),
+            warn=True,
+            hide=True,
+        )
+        if not result.ok:
+            raise Exception(f"preparing upload; remote_path={remote_path}, result={result}")
+        probe = [line.split(" ", 1) for line in result.stdout.splitlines() if " " in line]
+        if ["digest", digest] in probe:
+            logger.info(f"upload skipped, remote file is up to date; remote_path={remote_path}")
+            return Transfer.get_stats(method, size, 0, start, skipped=True)
+
+        num_chunks = max(1, -(-size // TRANSFER_CHUNK_SIZE))
+        written = {int(value) for key, value in probe if key == "chunk" and value.isdigit()}
+        pending = [i for i in range(num_chunks) if i not in written]
+        if written:
+            logger.info(
+                f"resuming upload; remote_path={remote_path}, chunks_written={len(written)}, "
+                f"chunks_pending={len(pending)}"
+            )
+
+        match method:
+            case "exec":
+                put_chunks = Transfer.put_chunks_exec
+            case "sftp":
+                put_chunks = functools.partial(
+                    Transfer.put_chunks_sftp, record_lock=threading.Lock()
+                )
+            case _:
+                raise Exception(f"unsupported transfer method; method={method}")
+
+        conn.open()
+        transport = conn.client.get_transport()
+        workers = max(1, min(connections, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    put_chunks, conn, transport, local_path, part, chunks, size, assigned
+                )
+                for assigned in [pending[i::workers] for i in range(workers)]
+            ]
+            for future in futures:
+                future.result()
+
+        result = conn.run(
+            FINALIZE_SCRIPT.format(
+                part=shlex.quote(part),
+                chunks=shlex.quote(chunks),
+                path=shlex.quote(remote_path),
+                digest=digest,
+                mode=f"{mode:o}",
+            ),
+            warn=True,
+            hide=True,
+        )
+        if not result.ok:
+            raise Exception(
+                f"uploaded file digest mismatch; remote_path={remote_path}, expected={digest}, "
+                f"actual={result.stdout.strip()}"
+            )
+        sent = sum(Transfer.get_chunk_length(i, size) for i in pending)
+        stats = Transfer.get_stats(method, size, sent, start)
+        logger.info(
+            f"upload complete; remote_path={remote_path}, method={method}, "
+            f"connections={workers}, bytes_sent={sent}, mb_s={stats['mb_s']}"
+        )
+        return stats
+
+    @staticmethod
+    def get_chunk_length(index: int, size: int) -> int:
+        return max(0, min(TRANSFER_CHUNK_SIZE, size - index * TRANSFER_CHUNK_SIZE))
+
+    @staticmethod
+    def get_stats(method: str, size: int, sent: int, start: float, skipped: bool = False) -> Dict:
+        seconds = time.perf_counter() - start
+        return {
+            "method": method,
+            "skipped": skipped,
+            "bytes": size,
+            "bytes_sent": sent,
+            "seconds": round(seconds, 3),
+            "mb_s": round(sent / seconds / 1e6, 1) if sent and seconds > 0 else None,
+        }
+
+    @staticmethod
+    def put_chunks_exec(
+        conn: Connection,
+        transport,
+        local_path: str,
+        part: str,
+        chunks: str,
+        size: int,
+        indexes: List[int],
+    ) -> None:
+        with open(local_path, "rb") as fh:
+            for index in indexes:
+                channel = transport.open_session()
+                try:
+                    channel.exec_command(
+                        EXEC_CHUNK_SCRIPT.format(
+                            part=shlex.quote(part),
+                            chunks=shlex.quote(chunks),
+                            chunk_size=TRANSFER_CHUNK_SIZE,
+                            index=index,
+                        )
+                    )
+                    fh.seek(index * TRANSFER_CHUNK_SIZE)
+                    remaining = Transfer.get_chunk_length(index, size)
+                    while remaining > 0:
+                        data = fh.read(min(TRANSFER_BUFFER_SIZE, remaining))
+                        if not data:
+                            raise Exception(f"local file truncated; path={local_path}")
+                        channel.sendall(data)
+                        remaining -= len(data)
+                    channel.shutdown_write()
+                    exit_status = channel.recv_exit_status()
+                finally:
+                    channel.close()
+                if exit_status != 0:
+                    raise Exception(
+                        f"writing chunk; host={conn.host}, part={part}, index={index}, "
+                        f"exit_status={exit_status}"
+                    )
+
+    @staticmethod
+    def put_chunks_sftp(
+        conn: Connection,
+        transport,
+        local_path: str,
+        part: str,
+        chunks: str,
+        size: int,
+        indexes: List[int],
+        record_lock: threading.Lock,
+    ) -> None:
+        # Each worker has its own SFTP session, on its own channel.
+        sftp = conn.client.open_sftp()
+        try:
+            with open(local_path, "rb") as fh:
+                for index in indexes:
+                    with sftp.open(part, "r+b") as remote_fh:
+                        # Writes are sent without waiting for each to be acknowledged, errors are
+                        # raised when the file is closed.
+                        remote_fh.set_pipelined(True)
+                        remote_fh.seek(index * TRANSFER_CHUNK_SIZE)
+                        fh.seek(index * TRANSFER_CHUNK_SIZE)
+                        remaining = Transfer.get_chunk_length(index, size)
+                        while remaining > 0:
+                            data = fh.read(min(TRANSFER_BUFFER_SIZE, remaining))
+                            if not data:
+                                raise Exception(f"local file truncated; path={local_path}")
+                            remote_fh.write(data)
+                            remaining -= len(data)
+                    # Chunks are written at their own offsets in the partial file, but an SFTP
+                    # append is written at the size of the file when it was opened, so the workers
+                    # record their chunks one at a time.
+                    with record_lock, sftp.open(chunks, "a") as chunks_fh:
+                        chunks_fh.write(f"{index}\n")
+        finally:
+            sftp.close()
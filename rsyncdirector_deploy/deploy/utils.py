@@ -4,27 +4,122 @@
 # Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
 # All rights reserved.
 
+from __future__ import annotations
+
+import os
 import sys
-import yaml
-from fabric import Connection
+from argparse import ArgumentTypeError, Namespace
+from concurrent.futures import ThreadPoolExecutor
 from logging import Logger
 from pathlib import Path
-from typing import Dict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
+
+from rsyncdirector_deploy.consts import REMOTE_SCRIPTS_DIR
+
+# fabric (and paramiko with it) and yaml are expensive to import so they are only imported when they
+# are actually used, keeping the startup of the cli and the rendering of the help fast.
+if TYPE_CHECKING:
+    from fabric import Connection
 
 
 class Utils(object):
 
     @staticmethod
     def get_connection(host: str, user: str) -> Connection:
+        from fabric import Connection
+
         return Connection(
             host=host,
             user=user,
         )
 
+    @staticmethod
+    def run_concurrently(
+        targets: List[Namespace], fn: Callable[[Namespace], Any], parallelism: int
+    ) -> List[Tuple[Namespace, Any, Exception | None]]:
+        """
+        Runs fn for each of the hosts, at most parallelism at a time, and returns a (args, result,
+        exception) tuple for each host in the same order as the targets.  An exception on one host
+        does not stop the others.
+        """
+
+        def call(args: Namespace) -> Tuple[Namespace, Any, Exception | None]:
+            try:
+                return args, fn(args), None
+            except Exception as e:
+                return args, None, e
+
+        with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(targets)))) as executor:
+            return list(executor.map(call, targets))
+
+    @staticmethod
+    def get_local_cache_dir(name: str) -> str:
+        cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(Path.home(), ".cache"))
+        path = os.path.join(cache_home, "rsyncdirector_deploy", name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def positive_int(value: str) -> int:
+        """
+        An argparse type for arguments that must be an integer greater than 0.
+        """
+        try:
+            retval = int(value)
+        except ValueError:
+            raise ArgumentTypeError(f"invalid int value: '{value}'")
+        if retval <= 0:
+            raise ArgumentTypeError(f"must be greater than 0: '{value}'")
+        return retval
+
+    @staticmethod
+    def check_required_args(args: Namespace, dests: List[str]) -> None:
+        # Some arguments can be provided either on the command line or via the inventory, so argparse
+        # cannot enforce them.
+        missing = [f"--{d.replace('_', '-')}" for d in dests if getattr(args, d, None) is None]
+        if missing:
+            raise Exception(
+                f"missing required arguments, provide them on the command line or in the inventory; "
+                f"host={args.installation_host}, missing={missing}"
+            )
+
     @staticmethod
     def load_yaml_file(path: str) -> Dict:
-        with open(path, "r") as fh:
-            return yaml.load(fh, Loader=yaml.FullLoader)
+        with open(path, "rb") as fh:
+            return Utils.load_yaml_string(fh.read())
+
+    @staticmethod
+    def load_yaml_string(data: str | bytes) -> Dict:
+        import yaml
+
+        # Use the libyaml backed safe loader when PyYAML was built with it, it is an order of
+        # magnitude faster than the pure Python loader.
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        return yaml.load(data, Loader=loader)
+
+    @staticmethod
+    def dump_yaml(data: Dict) -> str:
+        import yaml
+
+        dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+        return yaml.dump(data, Dumper=dumper, sort_keys=False, default_flow_style=False)
+
+    @staticmethod
+    def put_remote_script(conn: Connection, name: str) -> str:
+        """
+        Uploads one of the stdlib-only scripts in the rsyncdirector_deploy.remote package to the
+        remote host and returns its remote path.
+        """
+        local_path = Path(__file__).resolve().parent.parent / "remote" / name
+        remote_path = os.path.join(REMOTE_SCRIPTS_DIR, name)
+        result = conn.run(f"mkdir -p -m 755 {REMOTE_SCRIPTS_DIR}", warn=True, hide=True)
+        if not result.ok:
+            raise Exception(
+                f"creating remote scripts dir; path={REMOTE_SCRIPTS_DIR}, result={result}"
+            )
+        conn.put(str(local_path), remote_path)
+        conn.run(f"chmod 644 {remote_path}")
+        return remote_path
 
     @staticmethod
     def load_file(path: Path) -> str:
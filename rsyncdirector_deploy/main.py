@@ -10,9 +10,21 @@ import os
 import sys
 
 # from rsyncdirector_deploy.argparser import ArgParser
+from rsyncdirector_deploy.consts import (
+    TRANSFER_CONNECTIONS_DEFAULT,
+    TRANSFER_METHOD_DEFAULT,
+    TRANSFER_METHODS,
+)
+from rsyncdirector_deploy.deploy.benchmark import Benchmark
+from rsyncdirector_deploy.deploy.inventory import Inventory
 from rsyncdirector_deploy.deploy.python import Python
 from rsyncdirector_deploy.deploy.rsyncdirector import RsyncDirector
 
+# The registry of top-level subcommands that run on the installation hosts.  Importing and
+# registering them MUST remain cheap, see ArgParser; their heavy dependencies are only loaded when
+# the selected func runs.
+COMMANDS = [RsyncDirector, Python, Benchmark]
+
 logging.basicConfig(
     format="%(asctime)s,%(levelname)s,%(module)s,[%(threadName)s],%(message)s",
     level=logging.INFO,
@@ -23,13 +35,35 @@ logging.basicConfig(
 def parse_args():
     top_parser = argparse.ArgumentParser()
     common = argparse.ArgumentParser(add_help=False)
-    common.add_argument(
+    # Either install on a single host, or on the hosts selected from an inventory file.
+    target = common.add_mutually_exclusive_group(required=True)
+    target.add_argument(
         "--installation-host",
         "-o",
         type=str,
-        required=True,
         help="Hostname of machine onto which rsyncdirector is to be installed",
     )
+    target.add_argument(
+        "--inventory",
+        "-n",
+        type=str,
+        help=(
+            "Path to a YAML inventory file defining hosts, groups and per-group and per-host "
+            "values for any of the arguments.  Arguments provided on the command line override "
+            "the values in the inventory"
+        ),
+    )
+    common.add_argument(
+        "--limit",
+        "-l",
+        type=str,
+        default=None,
+        help=(
+            "Comma-separated list of group names and/or host name patterns selecting the hosts "
+            "from the inventory on which to run.  Prefix a pattern with '!' to exclude the hosts "
+            "that it matches.  Defaults to all of the hosts in the inventory"
+        ),
+    )
     common.add_argument(
         "--installation-user",
         "-s",
@@ -41,9 +75,34 @@ def parse_args():
         ),
     )
 
+    common.add_argument(
+        "--no-remote-agent",
+        action="store_true",
+        help=(
+            "Do not start the helper agent on the remote host, run each remote operation as a "
+            "separate command over SSH instead"
+        ),
+    )
+    common.add_argument(
+        "--transfer-method",
+        type=str,
+        choices=TRANSFER_METHODS,
+        default=TRANSFER_METHOD_DEFAULT,
+        help=(
+            "How files are uploaded to the remote host: 'exec' streams them into dd over SSH exec "
+            "channels, 'sftp' writes them with pipelined SFTP writes"
+        ),
+    )
+    common.add_argument(
+        "--transfer-connections",
+        type=int,
+        default=TRANSFER_CONNECTIONS_DEFAULT,
+        help="Number of SSH channels over which the chunks of each upload are sent in parallel",
+    )
+
     subparsers = top_parser.add_subparsers()
-    RsyncDirector.add_args(subparsers, [common])
-    Python.add_args(subparsers, [common])
+    for command in COMMANDS:
+        command.add_args(subparsers, [common])
 
     # If the user has not provided any arguments at all, print the help.
     if len(sys.argv) == 1:
@@ -61,7 +120,15 @@ def main():
     if "func" not in args:
         parser.print_help(sys.stderr)
         sys.exit(1)
-    args.func(args, logger)
+
+    targets = Inventory.get_targets(args, parser, sys.argv[1:])
+    # Subcommands that set the 'fleet' default are passed all of the hosts at once, the rest are
+    # run once per host.
+    if getattr(args, "fleet", False):
+        args.func(targets, logger)
+        return
+    for host_args in targets:
+        args.func(host_args, logger)
 
 
 ###########################################################
@@ -0,0 +1,168 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+# Uploaded to and started once per session on the installation host.  Reads one JSON request per
+# line from stdin, {"id": n, "op": name, "params": {...}}, runs it in process and writes one JSON
+# response per line to stdout, {"id": n, "ok": bool, "result": ..., "error": str}.  Exits when
+# stdin is closed.  It MUST only depend on the standard library, and support the python3 shipped
+# with the supported distros.
+
+import grp
+import json
+import os
+import pwd
+import subprocess
+import sys
+import tempfile
+
+
+def get_uid_gid(owner: str) -> tuple:
+    """
+    Resolves an owner in the form accepted by chown: 'user', 'user:group' or 'user:', the latter
+    using the user's login group.
+    """
+    user, sep, group = owner.partition(":")
+    pw = pwd.getpwnam(user)
+    if group:
+        return pw.pw_uid, grp.getgrnam(group).gr_gid
+    return pw.pw_uid, pw.pw_gid if sep else -1
+
+
+def op_ping(params: dict):
+    return {"pid": os.getpid(), "uid": os.getuid()}
+
+
+def op_stat(params: dict):
+    try:
+        st = os.stat(params["path"])
+    except FileNotFoundError:
+        return None
+    return {
+        "mode": oct(st.st_mode & 0o7777)[2:],
+        "uid": st.st_uid,
+        "gid": st.st_gid,
+        "size": st.st_size,
+        "is_dir": os.path.isdir(params["path"]),
+    }
+
+
+def op_mkdir(params: dict):
+    os.makedirs(params["path"], exist_ok=True)
+    set_owner_and_mode(params)
+
+
+def op_chown(params: dict):
+    uid, gid = get_uid_gid(params["owner"])
+    os.chown(params["path"], uid, gid)
+
+
+def op_chmod(params: dict):
+    os.chmod(params["path"], int(params["mode"], 8))
+
+
+def set_owner_and_mode(params: dict):
+    if params.get("owner"):
+        op_chown(params)
+    if params.get("mode"):
+        op_chmod(params)
+
+
+def op_write_file(params: dict):
+    # Written to a temp file in the same dir and renamed over the target so that readers never see
+    # a partially written file.
+    path = params["path"]
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".rsyncdirector_deploy-")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            fh.write(params["data"])
+        set_owner_and_mode(dict(params, path=tmp_path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def op_append_file(params: dict):
+    exists = os.path.exists(params["path"])
+    with open(params["path"], "a") as fh:
+        fh.write(params["data"])
+    if not exists:
+        set_owner_and_mode(params)
+
+
+def op_read_file(params: dict):
+    try:
+        with open(params["path"], "r") as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def op_getent(params: dict):
+    try:
+        if params["database"] == "passwd":
+            return list(pwd.getpwnam(params["key"]))
+        if params["database"] == "group":
+            entry = grp.getgrnam(params["key"])
+            return [entry.gr_name, entry.gr_passwd, entry.gr_gid, ",".join(entry.gr_mem)]
+    except KeyError:
+        return None
+    raise Exception("unsupported getent database; database={}".format(params["database"]))
+
+
+def op_run(params: dict):
+    argv = params["argv"]
+    if params.get("user"):
+        argv = ["sudo", "-u", params["user"], "-H", "--"] + argv
+    # Without input the command must not inherit the agent's stdin, which is the request channel.
+    stdin_args = (
+        {"input": params["input"]}
+        if params.get("input") is not None
+        else {"stdin": subprocess.DEVNULL}
+    )
+    proc = subprocess.run(
+        argv,
+        **stdin_args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    return {"exit_code": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr}
+
+
+OPS = {
+    "ping": op_ping,
+    "stat": op_stat,
+    "mkdir": op_mkdir,
+    "chown": op_chown,
+    "chmod": op_chmod,
+    "write_file": op_write_file,
+    "append_file": op_append_file,
+    "read_file": op_read_file,
+    "getent": op_getent,
+    "run": op_run,
+}
+
+
+def main() -> None:
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        response = {"id": request.get("id")}
+        try:
+            response["result"] = OPS[request["op"]](request.get("params", {}))
+            response["ok"] = True
+        except Exception as e:
+            response["ok"] = False
+            response["error"] = "{}: {}".format(type(e).__name__, e)
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
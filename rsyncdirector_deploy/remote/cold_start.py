@@ -0,0 +1,54 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+# Uploaded to and run on the installation host with the python from the rsyncdirector virtual
+# environment, as the user under which rsyncdirector runs.  It MUST only depend on the standard
+# library.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def measure(module: str, samples: int, env: dict) -> dict:
+    elapsed = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], check=True, env=env)
+        elapsed.append((time.perf_counter() - start) * 1000)
+    return {
+        "first_ms": elapsed[0],
+        "median_ms": statistics.median(elapsed),
+        "samples": samples,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", type=str, default="rsyncdirector.main")
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {"module": args.module}
+    results["precompiled"] = measure(args.module, args.samples, dict(os.environ))
+
+    # Point the bytecode cache at an empty directory and do not write to it so that every sample
+    # compiles the modules from source.  This is an upper bound of an instance starting without
+    # precompiled bytecode, as the stdlib is compiled from source as well.
+    with tempfile.TemporaryDirectory() as empty_dir:
+        env = dict(os.environ, PYTHONPYCACHEPREFIX=empty_dir, PYTHONDONTWRITEBYTECODE="1")
+        results["from_source"] = measure(args.module, args.samples, env)
+
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
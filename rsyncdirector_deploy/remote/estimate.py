@@ -0,0 +1,62 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+# Uploaded to and run on the installation host to estimate the size and number of files of the
+# sources of each rsyncdirector job in a single pass.  It MUST only depend on the standard library.
+
+import argparse
+import json
+import os
+
+
+def walk(path: str, totals: dict) -> None:
+    try:
+        stat = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return
+    totals["devices"].add(stat.st_dev)
+    if not os.path.isdir(path) or os.path.islink(path):
+        totals["bytes"] += stat.st_size
+        totals["files"] += 1
+        return
+
+    stack = [path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        totals["bytes"] += entry.stat(follow_symlinks=False).st_size
+                        totals["files"] += 1
+                except OSError:
+                    continue
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spec", type=str, required=True)
+    args = parser.parse_args()
+    spec = json.loads(args.spec)
+
+    jobs = {}
+    for job_id, sources in spec["jobs"].items():
+        totals = {"bytes": 0, "files": 0, "devices": set()}
+        for source in sources:
+            walk(source, totals)
+        totals["devices"] = sorted(totals["devices"])
+        jobs[job_id] = totals
+
+    print(json.dumps({"cpu_count": len(os.sched_getaffinity(0)), "jobs": jobs}))
+
+
+if __name__ == "__main__":
+    main()
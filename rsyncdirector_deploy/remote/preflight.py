@@ -0,0 +1,149 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+# Uploaded to and run on the installation host, as the user under which rsyncdirector runs, to
+# measure the link to each of the sync targets and the read throughput of the sync sources.  It MUST
+# only depend on the standard library.
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import tempfile
+import time
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def ssh_cmd(target: dict, compression: bool, remote_cmd: str) -> list:
+    cmd = ["ssh", "-o", "BatchMode=yes", "-o", f"Compression={'yes' if compression else 'no'}"]
+    if target.get("port"):
+        cmd.extend(["-p", str(target["port"])])
+    if target.get("private_key_path"):
+        cmd.extend(["-i", target["private_key_path"]])
+    cmd.extend([f"{target['user']}@{target['host']}", remote_cmd])
+    return cmd
+
+
+def measure_rtt(target: dict, samples: int) -> dict:
+    elapsed = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        with socket.create_connection((target["host"], int(target.get("port") or 22)), timeout=10):
+            elapsed.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": min(elapsed), "median_ms": statistics.median(elapsed)}
+
+
+def measure_ssh(target: dict, sample_path: str, sample_bytes: int) -> dict:
+    # The time to establish a session is measured separately and subtracted so that the throughput
+    # is that of the transfer itself.
+    start = time.perf_counter()
+    subprocess.run(ssh_cmd(target, False, "true"), check=True, capture_output=True, timeout=60)
+    setup_seconds = time.perf_counter() - start
+
+    retval = {"setup_ms": setup_seconds * 1000}
+    for compression in (False, True):
+        with open(sample_path, "rb") as fh:
+            start = time.perf_counter()
+            subprocess.run(
+                ssh_cmd(target, compression, "cat > /dev/null"),
+                stdin=fh,
+                check=True,
+                capture_output=True,
+                timeout=600,
+            )
+            elapsed = max(time.perf_counter() - start - setup_seconds, 1e-3)
+        key = "compressed_mb_s" if compression else "uncompressed_mb_s"
+        retval[key] = sample_bytes / elapsed / 1e6
+    return retval
+
+
+def iter_files(paths: list):
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, _, files in os.walk(path):
+            for name in files:
+                yield os.path.join(root, name)
+
+
+def measure_read(sources: list, limit_bytes: int, sample_fh, sample_limit_bytes: int) -> dict:
+    """
+    Sequentially reads the files in the sources, up to limit_bytes, dropping each file from the page
+    cache first so that the disk is measured rather than memory.  The first sample_limit_bytes read
+    are also written to sample_fh so that the ssh throughput is measured with representative data.
+    """
+    total = 0
+    sampled = 0
+    elapsed = 0.0
+    buf = bytearray(READ_BUFFER_SIZE)
+    for path in iter_files(sources):
+        if total >= limit_bytes:
+            break
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            while total < limit_bytes:
+                start = time.perf_counter()
+                n = os.readv(fd, [buf])
+                elapsed += time.perf_counter() - start
+                if n == 0:
+                    break
+                total += n
+                if sampled < sample_limit_bytes:
+                    sample_fh.write(buf[: min(n, sample_limit_bytes - sampled)])
+                    sampled += min(n, sample_limit_bytes - sampled)
+        finally:
+            os.close(fd)
+    return {
+        "bytes": total,
+        "sampled_bytes": sampled,
+        "mb_s": total / elapsed / 1e6 if elapsed > 0 else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spec", type=str, required=True)
+    args = parser.parse_args()
+    spec = json.loads(args.spec)
+
+    results = {"targets": []}
+    with tempfile.NamedTemporaryFile(prefix="rsyncdirector-preflight-") as sample_fh:
+        sample_limit_bytes = spec["sample_mb"] * 1024 * 1024
+        results["read"] = measure_read(
+            spec["sources"], spec["read_mb"] * 1024 * 1024, sample_fh, sample_limit_bytes
+        )
+        sample_bytes = results["read"]["sampled_bytes"]
+        # Not enough readable source data to sample, fall back to random data, which is the worst
+        # case for compression.
+        if sample_bytes < 1024 * 1024:
+            sample_fh.seek(0)
+            sample_fh.truncate()
+            sample_bytes = sample_limit_bytes
+            sample_fh.write(os.urandom(sample_bytes))
+        sample_fh.flush()
+
+        for target in spec["targets"]:
+            result = {"target": f"{target['user']}@{target['host']}"}
+            try:
+                result["rtt"] = measure_rtt(target, spec["rtt_samples"])
+                result["ssh"] = measure_ssh(target, sample_fh.name, sample_bytes)
+            except Exception as e:
+                result["error"] = str(e)
+            results["targets"].append(result)
+
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
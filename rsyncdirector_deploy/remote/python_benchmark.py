@@ -0,0 +1,94 @@
+# This software is released under the Revised BSD License.
+# See LICENSE for details
+#
+# Copyright (c) 2025, Ryan Chapin, https//:www.ryanchapin.com
+# All rights reserved.
+
+# Uploaded to and run on the installation host by the interpreter that was just built.  It MUST only
+# depend on the standard library.
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+# A document shaped like an rsyncdirector config so that the decode benchmark reflects its size.
+CONFIG_DOC = {
+    "rsync_id": "benchmark",
+    "cron_schedule": "0 2 * * *",
+    "jobs": [
+        {
+            "id": f"job-{i}",
+            "type": "remote",
+            "host": "backup.example.com",
+            "user": "backup",
+            "actions": [
+                {
+                    "id": f"sync-{i}-{j}",
+                    "action": "sync",
+                    "source": f"/data/{i}/{j}/",
+                    "dest": f"/backups/{i}/{j}",
+                    "opts": ["-av", "--delete"],
+                }
+                for j in range(10)
+            ],
+        }
+        for i in range(20)
+    ],
+}
+
+
+def timed(fn, samples: int) -> dict:
+    elapsed = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        elapsed.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": statistics.median(elapsed),
+        "min_ms": min(elapsed),
+        "max_ms": max(elapsed),
+        "samples": samples,
+    }
+
+
+def bench_json_decode(samples: int) -> dict:
+    # A freshly built interpreter does not have PyYAML, so the config shaped document is decoded
+    # with the standard library json module, which exercises the interpreter's C extensions.
+    doc = json.dumps(CONFIG_DOC)
+    return timed(lambda: json.loads(doc), samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--output", type=str, required=True)
+    parser.add_argument("--metadata", type=str, default="{}")
+    args = parser.parse_args()
+
+    true_path = "/bin/true" if os.path.exists("/bin/true") else "/usr/bin/true"
+    results = {
+        "hostname": socket.gethostname(),
+        "timestamp": time.time(),
+        "python_version": platform.python_version(),
+        "executable": sys.executable,
+        "interpreter_startup": timed(
+            lambda: subprocess.run([sys.executable, "-I", "-c", "pass"], check=True), args.samples
+        ),
+        "json_decode": bench_json_decode(args.samples * 10),
+        "subprocess_spawn": timed(lambda: subprocess.run([true_path], check=True), args.samples),
+    }
+    results.update(json.loads(args.metadata))
+
+    with open(args.output, "w") as fh:
+        json.dump(results, fh, indent=2)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()